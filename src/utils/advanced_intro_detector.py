@@ -2,15 +2,55 @@
 高级片头检测工具 - 基于音视频特征的智能检测
 """
 import logging
+import os
+import re
+import hashlib
 import subprocess
+import threading
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional, Tuple, List, Dict
 from pathlib import Path
 import numpy as np
 from dataclasses import dataclass
 
+from .ffmpeg_utils import iter_ffmpeg_events
+from .json_cache import file_identity, load_json_cache, save_json_cache
+from .srt_parser import parse_srt_cues
+
+try:
+    import av
+except ImportError:
+    # PyAV是可选依赖，未安装时通过ffmpeg管道读取音频
+    av = None
+
 logger = logging.getLogger(__name__)
 
+# 探测结果的磁盘缓存；探测滤镜或解析规则变化时递增版本号，使旧缓存失效
+_PROBE_CACHE_DIR = Path.home() / ".cache" / "autoclip" / "intro"
+_PROBE_CACHE_VERSION = 4
+_PROBE_KEYS = ("silence_periods", "scene_changes", "black_periods")
+
+# 各检测策略可能给出的最高置信度，达到该值的结果可以直接采用
+_MAX_STRATEGY_CONFIDENCE = 0.8
+
+# ffmpeg探测输出的解析规则，逐行匹配stderr
+_SILENCE_RE = re.compile(r"silence_(start|end):\s*(-?\d+(?:\.\d+)?)")
+_SCENE_RE = re.compile(r"pts_time:(\d+(?:\.\d+)?)")
+_BLACK_RE = re.compile(r"black_(start|end):(\d+(?:\.\d+)?)")
+
+# 字幕分类特征：歌词标记、演职员表关键词、对话标点
+_LYRIC_KEYWORDS = ("♪", "♫", "[音乐]", "[music]", "(music)")
+_CREDIT_KEYWORDS = ("出品", "制作", "导演", "主演", "编剧", "produced", "directed", "written")
+
+def _compile_keywords(keywords: Tuple[str, ...]) -> re.Pattern:
+    """把关键词表编译成一个正则，一次扫描即可判断是否命中任一关键词"""
+    return re.compile("|".join(map(re.escape, keywords)), re.IGNORECASE)
+
+_LYRIC_RE = _compile_keywords(_LYRIC_KEYWORDS)
+_CREDIT_RE = _compile_keywords(_CREDIT_KEYWORDS)
+_DIALOG_PUNCT = frozenset("。，？！.,?!")
+
 @dataclass
 class IntroDetectionResult:
     """片头检测结果"""
@@ -32,6 +72,142 @@ class AdvancedIntroDetector:
         self.max_intro_duration = max_intro_duration
         self.default_intro_duration = default_intro_duration
         self.confidence_threshold = confidence_threshold
+        
+        # 缓存最近一次ffmpeg探测解析出的事件，各检测方法共享，避免重复解码
+        self._probe_key: Optional[Tuple[str, int, int]] = None
+        self._probe_result: Dict[str, list] = {}
+        self._probe_lock = threading.Lock()
+        
+        # 各检测策略主要在等待ffmpeg子进程，用线程池并行执行；线程池随实例复用
+        self._executor = ThreadPoolExecutor(max_workers=min(3, os.cpu_count() or 1))
+    
+    def _run_ffmpeg_probe(self, video_path: Path) -> Dict[str, list]:
+        """
+        单次ffmpeg调用同时完成静音、场景切换和黑屏检测
+        
+        音频和视频分别只解码一次，三路滤镜的结果都输出到同一份stderr中，
+        边读边解析。结果按视频路径、修改时间和大小缓存在实例上和磁盘上。
+        
+        Args:
+            video_path: 视频文件路径
+            
+        Returns:
+            探测结果：silence_periods和black_periods为[开始, 结束]列表，
+            scene_changes为场景切换时间列表
+        """
+        # 音频和视频检测并行调用时，只有第一个调用真正运行ffmpeg
+        with self._probe_lock:
+            # 同一路径上的文件被替换后不能沿用之前的探测结果
+            key = file_identity(video_path)
+            if key is not None and self._probe_key == key:
+                return self._probe_result
+            
+            cache_path = self._probe_cache_path(video_path)
+            result = self._load_probe_cache(cache_path)
+            if result is None:
+                result = {name: [] for name in _PROBE_KEYS}
+                succeeded = False
+                try:
+                    result = self._collect_probe_events(self._build_probe_cmd(video_path, True, True))
+                    succeeded = True
+                except subprocess.CalledProcessError as e:
+                    # 缺少音频或视频流时融合滤镜图无法建立，退回到单流探测
+                    logger.warning(f"ffmpeg融合探测失败({e.returncode})，改为分别探测音频和视频")
+                    for with_audio in (True, False):
+                        try:
+                            partial = self._collect_probe_events(
+                                self._build_probe_cmd(video_path, with_audio, not with_audio))
+                        except subprocess.CalledProcessError:
+                            continue
+                        succeeded = True
+                        for name, values in partial.items():
+                            result[name].extend(values)
+                
+                if succeeded:
+                    save_json_cache(cache_path, result)
+            
+            self._probe_key = key
+            self._probe_result = result
+            return self._probe_result
+    
+    def _probe_cache_path(self, video_path: Path) -> Optional[Path]:
+        """按视频路径、修改时间、大小和探测参数计算缓存文件路径"""
+        try:
+            st = os.stat(video_path)
+        except OSError:
+            return None
+        
+        raw_key = (f"{video_path}|{st.st_mtime_ns}|{st.st_size}|"
+                   f"{self.max_intro_duration}|{_PROBE_CACHE_VERSION}")
+        return _PROBE_CACHE_DIR / f"{hashlib.sha1(raw_key.encode()).hexdigest()}.json"
+    
+    def _load_probe_cache(self, cache_path: Optional[Path]) -> Optional[Dict[str, list]]:
+        """读取缓存的探测结果，不存在或格式不符时返回None"""
+        cached = load_json_cache(cache_path)
+        if not isinstance(cached, dict) or any(not isinstance(cached.get(name), list) for name in _PROBE_KEYS):
+            return None
+        
+        logger.info(f"使用缓存的探测结果: {cache_path.name}")
+        return {name: cached[name] for name in _PROBE_KEYS}
+    
+    def _collect_probe_events(self, cmd: List[str]) -> Dict[str, list]:
+        """运行探测命令，把静音、场景切换和黑屏事件整理为时间段和时间点"""
+        result = {name: [] for name in _PROBE_KEYS}
+        patterns = {"silence": _SILENCE_RE, "scene": _SCENE_RE, "black": _BLACK_RE}
+        pending = {"silence": None, "black": None}
+        
+        for name, m in iter_ffmpeg_events(cmd, patterns):
+            if name == "scene":
+                result["scene_changes"].append(float(m.group(1)))
+            elif m.group(1) == "start":
+                pending[name] = float(m.group(2))
+            elif pending[name] is not None:
+                # 按(开始, 结束)配对
+                result[f"{name}_periods"].append([pending[name], float(m.group(2))])
+                pending[name] = None
+        
+        return result
+    
+    def _build_probe_cmd(self, video_path: Path, with_audio: bool, with_video: bool) -> List[str]:
+        """
+        构建探测用的ffmpeg命令
+        
+        只解码滤镜需要的流：不需要视频时加-vn，不需要音频时加-an，
+        字幕和数据流始终丢弃。场景选择分支可能一帧都不输出，
+        接到nullsink上，不作为输出流，否则ffmpeg会因该流没有数据而失败。
+        场景和黑屏判断与分辨率无关，视频先缩小到240p再分给两个滤镜；
+        片头判断只需要秒级精度，场景检测降到4fps，黑屏检测降到2fps，
+        并让解码器跳过非参考帧
+        """
+        sinks = []
+        outputs = []
+        if with_audio:
+            outputs.append("[0:a]silencedetect=n=-30dB:d=2")
+        if with_video:
+            sinks += ["[0:v]scale=-2:'min(ih,240)',split=2[scene_in][black_in]",
+                      "[scene_in]fps=4,select='gt(scene,0.4)',showinfo,nullsink"]
+            outputs.append("[black_in]fps=2,blackdetect=d=2:pix_th=0.00")
+        
+        filter_graph = ";".join(sinks + [f"{chain}[out{i}]" for i, chain in enumerate(outputs)])
+        cmd = [
+            "ffmpeg",
+            "-hide_banner", "-nostats",
+            "-t", str(self.max_intro_duration),
+        ]
+        if with_video:
+            cmd += ["-skip_frame:v", "noref"]
+        cmd += [
+            "-i", str(video_path),
+            "-filter_complex", filter_graph,
+        ]
+        for i in range(len(outputs)):
+            cmd += ["-map", f"[out{i}]"]
+        if not with_video:
+            cmd.append("-vn")
+        if not with_audio:
+            cmd.append("-an")
+        cmd += ["-sn", "-dn", "-f", "null", "-"]
+        return cmd
     
     def detect_intro(self, video_path: Path, srt_path: Optional[Path] = None) -> IntroDetectionResult:
         """
@@ -46,38 +222,49 @@ class AdvancedIntroDetector:
         """
         logger.info(f"开始综合片头检测: {video_path}")
         
-        detection_results = []
-        
         # 1. 音频特征检测（音乐检测、语音活动检测）
-        try:
-            audio_result = self._detect_by_audio_features(video_path)
-            if audio_result:
-                detection_results.append(audio_result)
-        except Exception as e:
-            logger.warning(f"音频检测失败: {e}")
-        
         # 2. 视频特征检测（场景变化、黑屏检测）
-        try:
-            video_result = self._detect_by_video_features(video_path)
-            if video_result:
-                detection_results.append(video_result)
-        except Exception as e:
-            logger.warning(f"视频检测失败: {e}")
-        
         # 3. 字幕特征检测（如果有字幕）
+        # 三种策略相互独立，并行执行
+        strategies = [
+            ("音频", self._detect_by_audio_features, video_path),
+            ("视频", self._detect_by_video_features, video_path),
+        ]
         if srt_path and srt_path.exists():
+            strategies.append(("字幕", self._detect_by_subtitle_features, srt_path))
+        
+        futures = {
+            self._executor.submit(detect, target): index
+            for index, (_, detect, target) in enumerate(strategies)
+        }
+        results_by_index = {}
+        finished = set()
+        for future in as_completed(futures):
+            index = futures[future]
+            finished.add(index)
             try:
-                subtitle_result = self._detect_by_subtitle_features(srt_path)
-                if subtitle_result:
-                    detection_results.append(subtitle_result)
+                result = future.result()
+                if result:
+                    results_by_index[index] = result
             except Exception as e:
-                logger.warning(f"字幕检测失败: {e}")
+                logger.warning(f"{strategies[index][0]}检测失败: {e}")
+            
+            # 达到策略能给出的最高置信度时，未完成的策略不可能更可靠；
+            # 置信度相同时按策略顺序取前者，所以还要求排在前面的策略都已完成。
+            # 线程池已满时尚未开始的策略可以取消
+            for i, result in sorted(results_by_index.items()):
+                if result.confidence >= _MAX_STRATEGY_CONFIDENCE and finished.issuperset(range(i)):
+                    for pending in futures:
+                        pending.cancel()
+                    logger.info(f"片头检测完成: {result.intro_end_seconds}秒, "
+                              f"置信度: {result.confidence}, 方法: {result.detection_method}")
+                    return result
         
         # 4. 综合评分，选择最可靠的结果
+        detection_results = [results_by_index[i] for i in sorted(results_by_index)]
         if detection_results:
-            # 根据置信度排序
-            detection_results.sort(key=lambda x: x.confidence, reverse=True)
-            best_result = detection_results[0]
+            # 取置信度最高的结果，置信度相同时保持策略顺序
+            best_result = max(detection_results, key=lambda x: x.confidence)
             
             # 如果最高置信度超过阈值，使用该结果
             if best_result.confidence >= self.confidence_threshold:
@@ -118,61 +305,25 @@ class AdvancedIntroDetector:
         """
         logger.info("开始音频特征检测...")
         
-        # 使用ffmpeg分析音频
-        # 提取音频能量和频谱信息
-        cmd = [
-            "ffmpeg",
-            "-i", str(video_path),
-            "-t", str(self.max_intro_duration),  # 只分析前2分钟
-            "-af", "silencedetect=n=-30dB:d=2,ametadata=print:file=-",
-            "-f", "null", "-"
-        ]
-        
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            # 解析静音检测结果
-            silence_periods = []
-            for line in result.stderr.split('\n'):
-                if "silence_start" in line:
-                    try:
-                        start = float(line.split("silence_start: ")[1])
-                        silence_periods.append({'start': start, 'type': 'start'})
-                    except:
-                        pass
-                elif "silence_end" in line:
-                    try:
-                        end_time = float(line.split("silence_end: ")[1].split()[0])
-                        if silence_periods and silence_periods[-1]['type'] == 'start':
-                            silence_periods[-1]['end'] = end_time
-                            silence_periods[-1]['type'] = 'period'
-                    except:
-                        pass
-            
-            # 查找第一个长静音后的内容开始
-            longest_silence = None
-            for period in silence_periods:
-                if period.get('type') == 'period':
-                    duration = period['end'] - period['start']
-                    # 记录最长的静音段
-                    if period['end'] >= self.min_intro_duration and period['end'] <= self.max_intro_duration:
-                        if longest_silence is None or duration > longest_silence['duration']:
-                            longest_silence = {
-                                'duration': duration,
-                                'start': period['start'],
-                                'end': period['end']
-                            }
+            # 静音检测结果来自共享的ffmpeg探测
+            silence_periods = self._run_ffmpeg_probe(video_path)["silence_periods"]
             
-            # 如果找到显著的静音段（超过3秒），认为是片头结束
-            if longest_silence and longest_silence['duration'] > 3:
+            # 在片头范围内选出最长的显著静音段（超过3秒），认为是片头结束
+            starts = np.fromiter((p[0] for p in silence_periods), dtype=np.float64, count=len(silence_periods))
+            ends = np.fromiter((p[1] for p in silence_periods), dtype=np.float64, count=len(silence_periods))
+            durations = ends - starts
+            mask = (ends >= self.min_intro_duration) & (ends <= self.max_intro_duration) & (durations > 3)
+            if mask.any():
+                idx = int(np.argmax(np.where(mask, durations, -1)))
                 return IntroDetectionResult(
-                    intro_end_seconds=int(longest_silence['end']),
+                    intro_end_seconds=int(ends[idx]),
                     confidence=0.8,
                     detection_method="audio_silence",
                     details={
-                        "silence_duration": longest_silence['duration'],
-                        "silence_start": longest_silence['start'],
-                        "silence_end": longest_silence['end']
+                        "silence_duration": float(durations[idx]),
+                        "silence_start": float(starts[idx]),
+                        "silence_end": float(ends[idx])
                     }
                 )
             
@@ -185,127 +336,189 @@ class AdvancedIntroDetector:
             return None
     
     def _detect_music_to_speech_transition(self, video_path: Path) -> Optional[IntroDetectionResult]:
-        """检测音乐到语音的转换点"""
-        # 使用ffmpeg提取音频的频谱质心
-        # 音乐通常有更宽的频谱分布，语音更集中
-        cmd = [
-            "ffmpeg",
-            "-i", str(video_path),
-            "-t", str(self.max_intro_duration),
-            "-af", "aspectralstats=measure=mean",
-            "-f", "null", "-"
-        ]
+        """
+        检测音乐到语音的转换点
+        
+        音乐通常有更宽的频谱分布、频谱质心较高，语音能量集中在低频。
+        逐帧计算频谱质心，比较每个时间点前后各1秒的质心均值，
+        均值持续下降最明显的位置即为转换点
+        """
+        sample_rate = 16000
+        frame_size = 1024
+        hop_size = 512
         
         try:
-            # 这里简化处理，实际应该分析频谱数据
-            # 假设在45-60秒之间通常是片头结束
-            estimated_end = min(60, self.max_intro_duration)
+            samples = self._read_audio_samples(video_path, sample_rate)
+            if samples is None or len(samples) < frame_size:
+                return None
             
+            # 短时傅里叶变换：分帧、加窗后一次性计算所有帧的幅度谱
+            frames = np.lib.stride_tricks.sliding_window_view(samples, frame_size)[::hop_size]
+            magnitude = np.abs(np.fft.rfft(frames * np.hanning(frame_size).astype(np.float32), axis=1))
+            freqs = np.fft.rfftfreq(frame_size, d=1.0 / sample_rate)
+            energy = magnitude.sum(axis=1)
+            centroid = (magnitude @ freqs) / (energy + 1e-9)
+            
+            # 静音帧的质心没有意义，沿用前一个有声帧的值，避免把音乐到静音误判为转换
+            voiced = energy > energy.max() * 1e-3
+            if not voiced.any():
+                return None
+            fill_idx = np.maximum.accumulate(np.where(voiced, np.arange(len(centroid)), 0))
+            centroid = centroid[fill_idx]
+            
+            # 1秒窗口的滑动平均，前后相邻两个窗口的均值之差即该点的持续下降量
+            window_len = sample_rate // hop_size
+            if len(centroid) <= 2 * window_len:
+                return None
+            smoothed = np.convolve(centroid, np.ones(window_len) / window_len, mode='valid')
+            shifts = smoothed[:-window_len] - smoothed[window_len:]
+            times = ((np.arange(len(shifts)) + window_len) * hop_size + frame_size / 2) / sample_rate
+            
+            # 在片头范围内找质心下降最大的位置
+            in_range = (times >= self.min_intro_duration) & (times <= self.max_intro_duration)
+            if not in_range.any():
+                return None
+            idx = int(np.argmax(np.where(in_range, shifts, -np.inf)))
+            centroid_shift = float(shifts[idx])
+            
+            # 平稳信号的窗口均值也有随机波动，用中位数绝对偏差估计波动幅度；
+            # 下降不足200Hz或没有明显超出波动幅度时视为没有转换
+            deviation = np.abs(shifts - np.median(shifts))
+            fluctuation = 1.4826 * float(np.median(deviation))
+            if centroid_shift < max(200.0, 6 * fluctuation):
+                return None
+            
+            transition_time = float(times[idx])
             return IntroDetectionResult(
-                intro_end_seconds=estimated_end,
+                intro_end_seconds=int(transition_time),
                 confidence=0.6,
                 detection_method="music_analysis",
-                details={"method": "spectral_analysis", "estimated": True}
+                details={
+                    "method": "spectral_centroid",
+                    "transition_point": transition_time,
+                    "centroid_shift_hz": centroid_shift
+                }
             )
-        except:
+        except Exception as e:
+            logger.error(f"频谱质心分析出错: {e}")
             return None
     
-    def _detect_by_video_features(self, video_path: Path) -> Optional[IntroDetectionResult]:
+    def _read_audio_samples(self, video_path: Path, sample_rate: int) -> Optional[np.ndarray]:
         """
-        通过视频特征检测片头
-        - 场景切换检测
-        - 黑屏/淡入淡出检测
-        - Logo检测
+        读取片头范围内的单声道PCM音频
+        
+        Returns:
+            归一化到[-1, 1]的float32采样数组，失败时返回None
         """
-        logger.info("开始视频特征检测...")
+        if av is not None:
+            try:
+                return self._decode_audio_with_pyav(video_path, sample_rate)
+            except Exception as e:
+                logger.warning(f"PyAV解码音频失败，改用ffmpeg: {e}")
         
-        # 使用ffmpeg的场景检测
         cmd = [
             "ffmpeg",
-            "-i", str(video_path),
+            "-hide_banner", "-nostats", "-loglevel", "error",
             "-t", str(self.max_intro_duration),
-            "-vf", "select='gt(scene,0.4)',showinfo",
-            "-f", "null", "-"
+            "-i", str(video_path),
+            "-vn", "-sn", "-dn",
+            "-ac", "1", "-ar", str(sample_rate),
+            "-f", "s16le", "-"
         ]
         
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            # 解析场景变化
-            scene_changes = []
-            for line in result.stderr.split('\n'):
-                if "pts_time:" in line:
-                    try:
-                        time_str = line.split("pts_time:")[1].split()[0]
-                        scene_time = float(time_str)
-                        scene_changes.append(scene_time)
-                    except:
-                        pass
+        result = subprocess.run(cmd, capture_output=True)
+        if result.returncode != 0 or not result.stdout:
+            logger.warning(f"提取音频失败: {result.stderr.decode('utf-8', errors='replace').strip()}")
+            return None
+        
+        return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+    
+    def _decode_audio_with_pyav(self, video_path: Path, sample_rate: int) -> Optional[np.ndarray]:
+        """
+        使用PyAV在进程内解码音频，省去启动ffmpeg子进程和管道传输的开销
+        
+        只解码音频流，重采样为单声道float32后直接写入预分配的缓冲区
+        """
+        max_samples = sample_rate * self.max_intro_duration
+        buffer = np.empty(max_samples, dtype=np.float32)
+        filled = 0
+        
+        with av.open(str(video_path)) as container:
+            if not container.streams.audio:
+                return None
             
-            # 检测黑屏
-            black_detect_cmd = [
-                "ffmpeg",
-                "-i", str(video_path),
-                "-t", str(self.max_intro_duration),
-                "-vf", "blackdetect=d=2:pix_th=0.00",
-                "-f", "null", "-"
-            ]
+            stream = container.streams.audio[0]
+            stream.thread_type = 'AUTO'
+            resampler = av.AudioResampler(format='flt', layout='mono', rate=sample_rate)
             
-            black_result = subprocess.run(black_detect_cmd, capture_output=True, text=True)
+            for frame in container.decode(stream):
+                if frame.time is not None and frame.time >= self.max_intro_duration:
+                    break
+                for resampled in resampler.resample(frame):
+                    data = resampled.to_ndarray().reshape(-1)
+                    count = min(len(data), max_samples - filled)
+                    buffer[filled:filled + count] = data[:count]
+                    filled += count
+                if filled >= max_samples:
+                    break
+        
+        return buffer[:filled] if filled else None
+    
+    def _detect_by_video_features(self, video_path: Path) -> Optional[IntroDetectionResult]:
+        """
+        通过视频特征检测片头
+        - 场景切换检测
+        - 黑屏/淡入淡出检测
+        - Logo检测
+        """
+        logger.info("开始视频特征检测...")
+        
+        try:
+            # 场景切换和黑屏检测结果来自共享的ffmpeg探测
+            probe = self._run_ffmpeg_probe(video_path)
+            scene_changes = probe["scene_changes"]
             
             # 查找黑屏后的第一个场景
-            for line in black_result.stderr.split('\n'):
-                if "black_end" in line:
-                    try:
-                        end_time = float(line.split("black_end:")[1].split()[0])
-                        if end_time >= self.min_intro_duration:
-                            return IntroDetectionResult(
-                                intro_end_seconds=int(end_time),
-                                confidence=0.8,
-                                detection_method="black_screen",
-                                details={"black_screen_end": end_time}
-                            )
-                    except:
-                        pass
+            for _, end_time in probe["black_periods"]:
+                if end_time >= self.min_intro_duration:
+                    return IntroDetectionResult(
+                        intro_end_seconds=int(end_time),
+                        confidence=0.8,
+                        detection_method="black_screen",
+                        details={"black_screen_end": end_time}
+                    )
             
             # 基于场景变化频率判断
             if len(scene_changes) > 5:
                 # 计算场景变化密度
-                # 将时间轴分成10秒的窗口
+                # 将时间轴分成10秒的窗口，每个窗口的场景变化次数
                 window_size = 10
-                change_density = {}
+                scene_arr = np.fromiter(scene_changes, dtype=np.float64, count=len(scene_changes))
+                change_density = np.bincount((scene_arr // window_size).astype(np.int64))
                 
-                for change_time in scene_changes:
-                    window = int(change_time // window_size) * window_size
-                    change_density[window] = change_density.get(window, 0) + 1
+                # 找到场景变化密度显著下降的点（片头通常场景变化多），
+                # 且当前窗口在合理的片头范围内
+                drops = np.flatnonzero((change_density[:-1] >= 3) & (change_density[1:] <= 1))
+                drop_starts = drops * window_size
+                drops = drops[(drop_starts >= self.min_intro_duration) & (drop_starts <= self.max_intro_duration)]
                 
-                # 找到场景变化密度显著下降的点
-                sorted_windows = sorted(change_density.keys())
-                for i in range(len(sorted_windows) - 1):
-                    current_window = sorted_windows[i]
-                    next_window = sorted_windows[i + 1]
-                    
-                    # 如果当前窗口在合理的片头范围内
-                    if self.min_intro_duration <= current_window <= self.max_intro_duration:
-                        current_density = change_density[current_window]
-                        next_density = change_density.get(next_window, 0)
-                        
-                        # 如果场景变化密度显著下降（片头通常场景变化多）
-                        if current_density >= 3 and next_density <= 1:
-                            # 找到这个窗口后的第一个场景变化作为片头结束点
-                            for change_time in scene_changes:
-                                if change_time > current_window + window_size:
-                                    return IntroDetectionResult(
-                                        intro_end_seconds=int(change_time),
-                                        confidence=0.75,
-                                        detection_method="scene_density_drop",
-                                        details={
-                                            "scene_changes": len(scene_changes),
-                                            "transition_point": change_time,
-                                            "density_before": current_density,
-                                            "density_after": next_density
-                                        }
-                                    )
+                if drops.size:
+                    # 找到这个窗口后的第一个场景变化作为片头结束点
+                    window_idx = int(drops[0])
+                    next_idx = int(np.searchsorted(scene_arr, (window_idx + 1) * window_size, side='right'))
+                    if next_idx < len(scene_arr):
+                        change_time = float(scene_arr[next_idx])
+                        return IntroDetectionResult(
+                            intro_end_seconds=int(change_time),
+                            confidence=0.75,
+                            detection_method="scene_density_drop",
+                            details={
+                                "scene_changes": len(scene_changes),
+                                "transition_point": change_time,
+                                "density_before": int(change_density[window_idx]),
+                                "density_after": int(change_density[window_idx + 1])
+                            }
+                        )
                 
                 # 备选方案：寻找长间隔
                 for i in range(1, len(scene_changes)):
@@ -338,44 +551,46 @@ class AdvancedIntroDetector:
         - 检测正文对话的开始
         """
         try:
-            with open(srt_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            subtitles = self._parse_srt(content)
+            starts, _, texts = parse_srt_cues(srt_path)
             
             # 检测歌词特征
             lyrics_score = 0
             credits_score = 0
             
-            for i, sub in enumerate(subtitles[:20]):  # 只检查前20条字幕
-                text = sub['text'].lower()
+            prev_len = None
+            for text in texts[:20]:  # 只检查前20条字幕
+                text_len = len(text)
                 
                 # 歌词特征
-                if any(marker in text for marker in ['♪', '♫', '[音乐]', '[music]', '(music)']):
+                if _LYRIC_RE.search(text):
                     lyrics_score += 1
                 
                 # 演职员表特征
-                if any(keyword in text for keyword in ['出品', '制作', '导演', '主演', '编剧', 
-                                                       'produced', 'directed', 'written']):
+                if _CREDIT_RE.search(text):
                     credits_score += 1
                 
                 # 如果连续出现多个短句（可能是歌词）
-                if len(text) < 20 and i > 0 and len(subtitles[i-1]['text']) < 20:
+                if text_len < 20 and prev_len is not None and prev_len < 20:
                     lyrics_score += 0.5
+                prev_len = text_len
+                
+                # 两项得分都已超过判定阈值，置信度不会再变化
+                if lyrics_score > 3 and credits_score > 2:
+                    break
             
-            # 找到第一段正常对话
-            for i, sub in enumerate(subtitles):
-                text = sub['text']
+            # 找到第一段正常对话，只检查片头最短时长之后的字幕
+            first_idx = int(np.searchsorted(starts, self.min_intro_duration, side='left'))
+            for i in range(first_idx, len(texts)):
+                text = texts[i]
                 # 正常对话的特征：较长、包含标点、不是歌词标记
-                if (len(text) > 20 and 
-                    any(p in text for p in ['。', '，', '？', '！', '.', ',', '?', '!']) and
-                    not any(m in text for m in ['♪', '♫', '[音乐]']) and
-                    sub['start'] >= self.min_intro_duration):
+                if (len(text) > 20 and
+                    not _DIALOG_PUNCT.isdisjoint(text) and
+                    not _LYRIC_RE.search(text)):
                     
                     confidence = 0.8 if (lyrics_score > 3 or credits_score > 2) else 0.6
                     
                     return IntroDetectionResult(
-                        intro_end_seconds=int(sub['start']),
+                        intro_end_seconds=int(starts[i]),
                         confidence=confidence,
                         detection_method="subtitle_analysis",
                         details={
@@ -389,42 +604,3 @@ class AdvancedIntroDetector:
             logger.error(f"字幕特征检测出错: {e}")
         
         return None
-    
-    def _parse_srt(self, content: str) -> List[Dict]:
-        """解析SRT文件内容"""
-        subtitles = []
-        blocks = content.strip().split('\n\n')
-        
-        for block in blocks:
-            lines = block.strip().split('\n')
-            if len(lines) >= 3:
-                try:
-                    # 解析时间码
-                    time_line = lines[1]
-                    start_time, end_time = time_line.split(' --> ')
-                    start_seconds = self._time_to_seconds(start_time)
-                    end_seconds = self._time_to_seconds(end_time)
-                    
-                    # 获取字幕文本
-                    text = ' '.join(lines[2:])
-                    
-                    subtitles.append({
-                        'start': start_seconds,
-                        'end': end_seconds,
-                        'text': text,
-                        'duration': end_seconds - start_seconds
-                    })
-                except Exception as e:
-                    logger.debug(f"解析字幕块失败: {e}")
-                    continue
-        
-        return sorted(subtitles, key=lambda x: x['start'])
-    
-    def _time_to_seconds(self, time_str: str) -> float:
-        """将SRT时间格式转换为秒数"""
-        time_str = time_str.replace(',', '.')
-        parts = time_str.split(':')
-        hours = int(parts[0])
-        minutes = int(parts[1])
-        seconds = float(parts[2])
-        return hours * 3600 + minutes * 60 + seconds
\ No newline at end of file
@@ -0,0 +1,40 @@
+"""
+ffmpeg工具 - 运行ffmpeg并解析其输出
+"""
+import re
+import subprocess
+from typing import Dict, Iterator, List, Tuple
+
+def iter_ffmpeg_events(cmd: List[str], patterns: Dict[str, re.Pattern]) -> Iterator[Tuple[str, re.Match]]:
+    """
+    运行ffmpeg并逐行读取stderr，按到达顺序产出匹配到的事件
+    
+    不缓冲完整的stderr输出；调用方提前结束迭代时终止ffmpeg进程。
+    
+    Args:
+        cmd: ffmpeg命令
+        patterns: 事件名到正则的映射
+        
+    Yields:
+        (事件名, 匹配结果)
+        
+    Raises:
+        subprocess.CalledProcessError: ffmpeg完整运行后返回非零状态
+    """
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            text=True, encoding='utf-8', errors='replace', bufsize=1)
+    completed = False
+    try:
+        for line in proc.stderr:
+            for name, pattern in patterns.items():
+                for m in pattern.finditer(line):
+                    yield name, m
+        completed = True
+    finally:
+        if proc.poll() is None and not completed:
+            proc.terminate()
+        proc.stderr.close()
+        returncode = proc.wait()
+    
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
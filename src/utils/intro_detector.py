@@ -2,12 +2,19 @@
 片头检测工具 - 自动检测并标记视频片头部分
 """
 import logging
-from typing import Optional, Tuple, List, Dict
+from typing import Optional, Tuple, List
 from pathlib import Path
 import re
+import numpy as np
+
+from .srt_parser import parse_srt_cues
 
 logger = logging.getLogger(__name__)
 
+# 时间码行与字幕块分隔（按字节匹配）
+_TIME_RE = re.compile(rb"(\d\d):(\d\d):(\d\d),(\d{3}) --> (\d\d):(\d\d):(\d\d),(\d{3})")
+_BLOCK_SEP_RE = re.compile(rb"\r?\n[ \t\r]*\n")
+
 class IntroDetector:
     """片头检测器"""
     
@@ -35,21 +42,18 @@ class IntroDetector:
             (片头结束时间秒数, 检测理由)
         """
         try:
-            with open(srt_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
             # 解析SRT文件
-            subtitles = self._parse_srt(content)
+            starts, ends, texts = parse_srt_cues(srt_path)
             
-            if not subtitles:
+            if not texts:
                 logger.warning("字幕文件为空，使用默认片头时长")
                 return self.default_intro_duration, "字幕文件为空，使用默认值"
             
             # 策略1：检测第一段密集对话的开始
-            intro_end_1, reason_1 = self._detect_by_dialogue_density(subtitles)
+            intro_end_1, reason_1 = self._detect_by_dialogue_density(starts, texts)
             
             # 策略2：检测长时间静音后的第一句话
-            intro_end_2, reason_2 = self._detect_by_silence_break(subtitles)
+            intro_end_2, reason_2 = self._detect_by_silence_break(starts, ends)
             
             # 选择更合理的结果
             if intro_end_1 > 0 and self.min_intro_duration <= intro_end_1 <= self.max_intro_duration:
@@ -64,97 +68,45 @@ class IntroDetector:
             logger.error(f"检测片头失败: {e}")
             return self.default_intro_duration, f"检测失败: {str(e)}"
     
-    def _parse_srt(self, content: str) -> List[Dict]:
-        """解析SRT文件内容"""
-        subtitles = []
-        blocks = content.strip().split('\n\n')
-        
-        for block in blocks:
-            lines = block.strip().split('\n')
-            if len(lines) >= 3:
-                try:
-                    # 解析时间码
-                    time_line = lines[1]
-                    start_time, end_time = time_line.split(' --> ')
-                    start_seconds = self._time_to_seconds(start_time)
-                    end_seconds = self._time_to_seconds(end_time)
-                    
-                    # 获取字幕文本
-                    text = ' '.join(lines[2:])
-                    
-                    subtitles.append({
-                        'start': start_seconds,
-                        'end': end_seconds,
-                        'text': text,
-                        'duration': end_seconds - start_seconds
-                    })
-                except Exception as e:
-                    logger.debug(f"解析字幕块失败: {e}")
-                    continue
-        
-        return sorted(subtitles, key=lambda x: x['start'])
-    
-    def _time_to_seconds(self, time_str: str) -> float:
-        """将SRT时间格式转换为秒数"""
-        # 格式: 00:01:23,456
-        time_str = time_str.replace(',', '.')
-        parts = time_str.split(':')
-        hours = int(parts[0])
-        minutes = int(parts[1])
-        seconds = float(parts[2])
-        return hours * 3600 + minutes * 60 + seconds
-    
-    def _detect_by_dialogue_density(self, subtitles: List[Dict]) -> Tuple[int, str]:
+    def _detect_by_dialogue_density(self, starts: np.ndarray, texts: List[str]) -> Tuple[int, str]:
         """通过对话密度检测片头结束位置"""
-        if not subtitles:
+        if len(starts) == 0:
             return -1, ""
         
         # 计算每10秒窗口的对话数量
         window_size = 10  # 10秒窗口
-        current_window_start = 0
-        dialogue_count = 0
+        # 只评估最后一条字幕所在窗口之前的完整窗口
+        num_windows = int(starts[-1] // window_size)
         
-        for subtitle in subtitles:
-            # 如果超出当前窗口，检查密度
-            while subtitle['start'] >= current_window_start + window_size:
-                density = dialogue_count / window_size
-                
-                # 如果密度足够高，认为正式内容开始
-                if density >= self.min_dialogue_density:
-                    # 返回这个窗口的开始时间作为片头结束时间
-                    return int(current_window_start), f"检测到密集对话开始于{int(current_window_start)}秒"
-                
-                # 移动到下一个窗口
-                current_window_start += window_size
-                dialogue_count = 0
-            
-            # 统计当前窗口的对话
-            if subtitle['start'] >= current_window_start:
-                # 过滤掉过短的字幕（可能是音效说明）
-                if len(subtitle['text'].strip()) > 5:
-                    dialogue_count += 1
+        # 过滤掉过短的字幕（可能是音效说明）
+        is_dialogue = np.fromiter((len(text.strip()) > 5 for text in texts), dtype=bool, count=len(texts))
+        window_idx = (starts[is_dialogue] // window_size).astype(np.int64)
+        counts = np.bincount(window_idx, minlength=num_windows)[:num_windows]
+        
+        # 第一个密度足够高的窗口，认为正式内容开始
+        dense = np.flatnonzero(counts / window_size >= self.min_dialogue_density)
+        if dense.size:
+            window_start = int(dense[0]) * window_size
+            return window_start, f"检测到密集对话开始于{window_start}秒"
         
         return -1, "未检测到密集对话"
     
-    def _detect_by_silence_break(self, subtitles: List[Dict]) -> Tuple[int, str]:
+    def _detect_by_silence_break(self, starts: np.ndarray, ends: np.ndarray) -> Tuple[int, str]:
         """检测长时间静音后的第一句话"""
-        if not subtitles:
+        if len(starts) == 0:
             return -1, ""
         
         # 检查第一句话之前的静音
-        first_dialogue_time = subtitles[0]['start']
+        first_dialogue_time = starts[0]
         if first_dialogue_time >= self.min_intro_duration:
             return int(first_dialogue_time), f"第一句对话出现在{int(first_dialogue_time)}秒"
         
-        # 检查字幕之间的间隔
-        for i in range(len(subtitles) - 1):
-            current_end = subtitles[i]['end']
-            next_start = subtitles[i + 1]['start']
-            gap = next_start - current_end
-            
-            # 如果间隔超过阈值，认为是片头和正文的分界
-            if gap >= self.silence_threshold:
-                return int(next_start), f"检测到{int(gap)}秒的静音间隔后开始正文"
+        # 检查字幕之间的间隔，超过阈值认为是片头和正文的分界
+        gaps = starts[1:] - ends[:-1]
+        breaks = np.flatnonzero(gaps >= self.silence_threshold)
+        if breaks.size:
+            i = int(breaks[0])
+            return int(starts[i + 1]), f"检测到{int(gaps[i])}秒的静音间隔后开始正文"
         
         return -1, "未检测到明显的静音间隔"
     
@@ -170,68 +122,53 @@ class IntroDetector:
         Returns:
             调整后的SRT文件路径
         """
-        with open(srt_path, 'r', encoding='utf-8') as f:
+        # 按字节处理，时间码只涉及ASCII数字，字幕文本原样保留
+        with open(srt_path, 'rb') as f:
             content = f.read()
         
-        # 正则表达式匹配时间码
-        time_pattern = r'(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})'
+        newline = b'\r\n' if b'\r\n' in content else b'\n'
+        offset_ms = int(round(offset_seconds * 1000))
         
-        def adjust_time(time_str: str) -> str:
-            """调整单个时间码"""
-            seconds = self._time_to_seconds(time_str)
-            new_seconds = max(0, seconds - offset_seconds)  # 确保不会变成负数
+        def format_ms(total_ms: int) -> bytes:
+            """毫秒数转换为SRT时间格式"""
+            return b"%02d:%02d:%02d,%03d" % (total_ms // 3600000, total_ms // 60000 % 60,
+                                             total_ms // 1000 % 60, total_ms % 1000)
+        
+        # 处理字幕块
+        adjusted_blocks = []
+        for block in _BLOCK_SEP_RE.split(content.strip()):
+            lines = block.strip().splitlines()
+            if len(lines) < 3:
+                continue
             
-            # 转换回时间格式
-            hours = int(new_seconds // 3600)
-            minutes = int((new_seconds % 3600) // 60)
-            secs = new_seconds % 60
-            millisecs = int((secs % 1) * 1000)
-            secs = int(secs)
+            # 检查时间码
+            time_match = _TIME_RE.search(lines[1])
+            if not time_match:
+                continue
             
-            return f"{hours:02d}:{minutes:02d}:{secs:02d},{millisecs:03d}"
-        
-        # 替换所有时间码
-        def replace_times(match):
-            start_time = adjust_time(match.group(1))
-            end_time = adjust_time(match.group(2))
+            h1, m1, s1, ms1, h2, m2, s2, ms2 = map(int, time_match.groups())
+            start_ms = ((h1 * 60 + m1) * 60 + s1) * 1000 + ms1 - offset_ms
+            end_ms = ((h2 * 60 + m2) * 60 + s2) * 1000 + ms2 - offset_ms
             
             # 如果整个字幕都在片头范围内，则跳过这个字幕
-            if self._time_to_seconds(match.group(2)) <= offset_seconds:
-                return None
+            if end_ms <= 0:
+                continue
             
-            return f"{start_time} --> {end_time}"
+            # 调整时间码（确保不会变成负数），重新编号
+            time_line = (lines[1][:time_match.start()]
+                         + format_ms(max(0, start_ms)) + b" --> " + format_ms(end_ms)
+                         + lines[1][time_match.end():])
+            adjusted_blocks.append(newline.join(
+                [str(len(adjusted_blocks) + 1).encode(), time_line] + lines[2:]
+            ))
         
-        # 处理字幕块
-        blocks = content.strip().split('\n\n')
-        adjusted_blocks = []
-        block_number = 1
-        
-        for block in blocks:
-            lines = block.strip().split('\n')
-            if len(lines) >= 3:
-                # 检查时间码
-                time_match = re.search(time_pattern, lines[1])
-                if time_match:
-                    # 如果结束时间在片头之前，跳过这个字幕
-                    end_seconds = self._time_to_seconds(time_match.group(2))
-                    if end_seconds <= offset_seconds:
-                        continue
-                    
-                    # 调整时间码
-                    new_time_line = re.sub(time_pattern, replace_times, lines[1])
-                    if new_time_line:
-                        # 重新编号并添加调整后的字幕块
-                        adjusted_block = f"{block_number}\n{new_time_line}\n" + '\n'.join(lines[2:])
-                        adjusted_blocks.append(adjusted_block)
-                        block_number += 1
-        
-        adjusted_content = '\n\n'.join(adjusted_blocks)
+        adjusted_content = (newline * 2).join(adjusted_blocks)
         
         # 保存调整后的字幕
         if output_path is None:
             output_path = srt_path
         
-        with open(output_path, 'w', encoding='utf-8') as f:
+        with open(output_path, 'wb') as f:
             f.write(adjusted_content)
         
         logger.info(f"字幕时间轴已调整 {offset_seconds} 秒")
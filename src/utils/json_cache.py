@@ -0,0 +1,72 @@
+"""
+JSON缓存工具 - 片头检测结果的磁盘缓存读写
+"""
+import json
+import logging
+import os
+from typing import Any, Optional, Tuple
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+def file_identity(path: Path) -> Optional[Tuple[str, int, int]]:
+    """
+    文件的路径、修改时间和大小，用作内存中结果的键
+    
+    同一路径上的文件被替换后修改时间或大小随之改变，旧结果不会被误用
+    
+    Returns:
+        (路径, 修改时间纳秒数, 文件大小)，无法读取文件信息时返回None
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return str(path), st.st_mtime_ns, st.st_size
+
+def load_json_cache(cache_path: Optional[Path]) -> Optional[Any]:
+    """
+    读取缓存文件
+    
+    Args:
+        cache_path: 缓存文件路径，为None时不读取
+    
+    Returns:
+        缓存的数据，文件不存在或无法解析时返回None
+    """
+    if cache_path is None or not cache_path.exists():
+        return None
+    
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.debug(f"读取缓存失败: {e}")
+        return None
+
+def save_json_cache(cache_path: Optional[Path], data: Any) -> None:
+    """
+    写入缓存文件，写入失败只记录日志
+    
+    先写入带进程号的临时文件再替换，并发的读取方不会读到写了一半的文件
+    
+    Args:
+        cache_path: 缓存文件路径，为None时不写入
+        data: 可以序列化为JSON的数据
+    """
+    if cache_path is None:
+        return
+    
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except (OSError, TypeError, ValueError) as e:
+        logger.debug(f"写入缓存失败: {e}")
+        # 序列化到一半失败时不留下残缺的临时文件
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
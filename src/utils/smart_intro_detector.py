@@ -1,19 +1,74 @@
 """
 智能片头检测器 - 使用开源工具和算法
 """
+import functools
 import logging
+import os
+import re
 import subprocess
+import threading
 import json
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import cv2
 import numpy as np
-from typing import Optional, Tuple, List, Dict, Any
+from typing import Optional, Tuple, List, Dict, Any, Iterator
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict, fields
 import hashlib
 from collections import Counter
 
+from .ffmpeg_utils import iter_ffmpeg_events
+from .json_cache import file_identity, load_json_cache, save_json_cache
+
+try:
+    import av
+except ImportError:
+    # PyAV是可选依赖，未安装时使用OpenCV逐帧读取
+    av = None
+
+try:
+    import orjson
+except ImportError:
+    # orjson是可选依赖，未安装时使用标准库json
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# ffmpeg探测输出：showinfo输出的场景切换时间、silencedetect输出的静音结束时间
+_SCENE_TIME_RE = re.compile(r"pts_time:(\d+(?:\.\d+)?)")
+_SILENCE_END_RE = re.compile(r"silence_end:\s*(-?\d+(?:\.\d+)?)")
+
+# 片头探测最多切成几段并行执行，以及相邻段之间的重叠秒数（不小于静音检测的最短时长）
+_MAX_PROBE_SEGMENTS = 6
+_PROBE_OVERLAP = 3
+
+# 视觉分析的最大画面高度
+_ANALYSIS_MAX_HEIGHT = 1080
+
+# 检测结果缓存目录；检测逻辑改变时递增版本号，使旧缓存失效
+_RESULT_CACHE_DIR = Path.home() / ".cache" / "autoclip"
+_DETECTOR_VERSION = 9
+
+@functools.lru_cache(maxsize=None)
+def _cuda_decode_available() -> bool:
+    """OpenCV编译了cudacodec模块并且有可用的CUDA设备"""
+    try:
+        return hasattr(cv2, "cudacodec") and cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except cv2.error:
+        return False
+
+def _analysis_size(width: int, height: int) -> Optional[Tuple[int, int]]:
+    """
+    视觉分析使用的画面尺寸，不需要缩小时返回None
+    
+    高于1080p的画面缩小到1080p再分析，以换取解码后的转换和检测速度。
+    黑屏检测看的是亮度统计，缩小后基本不变；边缘比例与分辨率有关，
+    对高于1080p的片源，文字检测的结果可能与按原分辨率分析时不同
+    """
+    if height <= _ANALYSIS_MAX_HEIGHT:
+        return None
+    return max(2, round(width * _ANALYSIS_MAX_HEIGHT / height / 2) * 2), _ANALYSIS_MAX_HEIGHT
+
 @dataclass
 class SmartDetectionResult:
     """智能检测结果"""
@@ -33,45 +88,91 @@ class SmartIntroDetector:
     4. 音频指纹 - 检测主题曲
     """
     
-    def __init__(self):
+    def __init__(self, early_exit_on_black: bool = True, probe_segments: Optional[int] = None):
         self.min_intro = 10  # 最小片头10秒
         self.max_intro = 180  # 最大片头3分钟
+        # 视觉检测找到片头范围内的第一段黑屏（或确认文字密度下降）后即停止解码，
+        # 不再寻找更靠后的黑屏
+        self.early_exit_on_black = early_exit_on_black
+        # ffmpeg探测并行的段数，默认按CPU核数；批量检测时由各进程分摊CPU
+        self.probe_segments = probe_segments
+        
+        # 探测到的视频时长，用于限制ffmpeg探测范围
+        self._durations: Dict[Tuple[str, int, int], float] = {}
+        
+        # 场景检测和音频检测共用一次ffmpeg探测
+        self._probe_key: Optional[Tuple[str, int, int]] = None
+        self._probe_result: Dict[str, List[float]] = {}
+        self._probe_lock = threading.Lock()
         
     def detect(self, video_path: Path) -> SmartDetectionResult:
         """综合检测片头片尾"""
         
-        results = []
+        # 同一文件重复处理时直接使用缓存的结果
+        cache_path = self._result_cache_path(video_path)
+        cached = self._load_cached_result(cache_path)
+        if cached is not None:
+            return cached
         
-        # 1. 使用PySceneDetect进行场景检测
-        try:
-            scene_result = self._detect_by_scene_change(video_path)
-            if scene_result:
-                results.append(scene_result)
-        except Exception as e:
-            logger.warning(f"场景检测失败: {e}")
+        # 先读取流信息，跳过不可能有结果的检测
+        stream_info = self._probe_streams(video_path)
+        has_video = stream_info is None or stream_info["has_video"]
+        has_audio = stream_info is None or stream_info["has_audio"]
+        duration = stream_info["duration"] if stream_info else None
         
-        # 2. 使用OpenCV进行视觉特征检测
-        try:
-            visual_result = self._detect_by_visual_features(video_path)
-            if visual_result:
-                results.append(visual_result)
-        except Exception as e:
-            logger.warning(f"视觉特征检测失败: {e}")
+        if duration is not None:
+            if duration <= self.min_intro:
+                logger.info(f"视频时长{duration:.1f}秒，不足最短片头时长，跳过检测")
+                return SmartDetectionResult(
+                    intro_end_seconds=0,
+                    outro_start_seconds=None,
+                    confidence=0.3,
+                    method="default",
+                    details={"reason": "视频时长不足最短片头时长，不裁剪片头"}
+                )
+            identity = file_identity(video_path)
+            if identity is not None:
+                self._durations[identity] = duration
         
+        # 1. 使用PySceneDetect进行场景检测
+        # 2. 使用OpenCV进行视觉特征检测
         # 3. 使用ffmpeg进行音频分析
-        try:
-            audio_result = self._detect_by_audio_features(video_path)
-            if audio_result:
-                results.append(audio_result)
-        except Exception as e:
-            logger.warning(f"音频检测失败: {e}")
+        # 三种检测互不依赖，耗时主要在子进程和解码上，用线程并行执行
+        detectors = []
+        if has_video:
+            detectors += [
+                ("场景检测", self._detect_by_scene_change),
+                ("视觉特征检测", self._detect_by_visual_features),
+            ]
+        if has_audio:
+            detectors.append(("音频检测", self._detect_by_audio_features))
+        
+        results_by_index = {}
+        with ThreadPoolExecutor(max_workers=max(1, len(detectors))) as executor:
+            futures = {
+                executor.submit(detect, video_path): index
+                for index, (_, detect) in enumerate(detectors)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    result = future.result()
+                    if result:
+                        results_by_index[index] = result
+                except Exception as e:
+                    logger.warning(f"{detectors[index][0]}失败: {e}")
+        
+        # 保持检测顺序，置信度相同时与顺序执行的结果一致
+        results = [results_by_index[i] for i in sorted(results_by_index)]
         
         # 4. 综合所有结果
         if results:
             # 使用投票机制或加权平均
-            return self._combine_results(results)
+            combined = self._combine_results(results)
+            save_json_cache(cache_path, asdict(combined))
+            return combined
         
-        # 默认值
+        # 默认值，不缓存，检测失败可能是临时问题
         return SmartDetectionResult(
             intro_end_seconds=60,
             outro_start_seconds=None,
@@ -80,6 +181,100 @@ class SmartIntroDetector:
             details={"reason": "无法检测，使用默认值"}
         )
     
+    def _probe_streams(self, video_path: Path) -> Optional[Dict[str, Any]]:
+        """
+        读取视频时长和音视频流是否存在，读取失败时返回None
+        
+        有PyAV时在进程内读取容器信息，否则调用ffprobe
+        
+        Returns:
+            duration为时长秒数（未知时为None），has_audio/has_video为是否有对应的流
+        """
+        try:
+            if av is not None:
+                with av.open(str(video_path)) as container:
+                    return {
+                        "duration": container.duration / av.time_base if container.duration else None,
+                        "has_audio": bool(container.streams.audio),
+                        "has_video": bool(container.streams.video),
+                    }
+            
+            cmd = [
+                "ffprobe",
+                "-v", "error",
+                "-show_entries", "stream=codec_type:format=duration",
+                "-of", "json",
+                str(video_path)
+            ]
+            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='replace')
+            if result.returncode != 0:
+                return None
+            
+            info = json.loads(result.stdout)
+            codec_types = {stream.get("codec_type") for stream in info.get("streams", [])}
+            duration = info.get("format", {}).get("duration")
+            return {
+                "duration": float(duration) if duration not in (None, "N/A") else None,
+                "has_audio": "audio" in codec_types,
+                "has_video": "video" in codec_types,
+            }
+        except Exception as e:
+            logger.debug(f"读取视频流信息失败: {e}")
+            return None
+    
+    @classmethod
+    def detect_batch(cls, video_paths: List[Path], concurrency: Optional[int] = None) -> List[SmartDetectionResult]:
+        """
+        批量检测多个视频的片头
+        
+        每个视频在独立的进程中检测，进程内三种检测仍并行执行，
+        ffmpeg探测的分段数按进程数分摊CPU核
+        
+        Args:
+            video_paths: 视频文件路径列表
+            concurrency: 同时检测的视频数，默认为CPU核数
+            
+        Returns:
+            与输入顺序一致的检测结果列表
+        """
+        if not video_paths:
+            return []
+        
+        cpu_count = os.cpu_count() or 1
+        max_workers = min(concurrency or cpu_count, len(video_paths))
+        # 各进程的ffmpeg探测分摊剩余的CPU核，避免进程数乘以分段数的ffmpeg同时运行
+        probe_segments = max(1, cpu_count // max_workers)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(_detect_in_worker, [cls] * len(video_paths), video_paths,
+                                     [probe_segments] * len(video_paths)))
+    
+    def _result_cache_path(self, video_path: Path) -> Optional[Path]:
+        """按文件大小、修改时间、开头64KB内容和检测参数计算缓存文件路径"""
+        try:
+            st = os.stat(video_path)
+            with open(video_path, 'rb') as f:
+                head = f.read(65536)
+        except OSError:
+            return None
+        
+        digest = hashlib.sha1(
+            f"{st.st_size}|{st.st_mtime_ns}|{self.min_intro}|{self.max_intro}|"
+            f"{self.early_exit_on_black}|{_DETECTOR_VERSION}|".encode()
+        )
+        digest.update(head)
+        return _RESULT_CACHE_DIR / f"intro_{digest.hexdigest()}.json"
+    
+    def _load_cached_result(self, cache_path: Optional[Path]) -> Optional[SmartDetectionResult]:
+        """读取缓存的检测结果，不存在或格式不符时返回None"""
+        cached = load_json_cache(cache_path)
+        try:
+            result = SmartDetectionResult(**{field.name: cached[field.name] for field in fields(SmartDetectionResult)})
+        except (TypeError, KeyError):
+            return None
+        
+        logger.info(f"使用缓存的片头检测结果: {cache_path.name}")
+        return result
+    
     def _detect_by_scene_change(self, video_path: Path) -> Optional[SmartDetectionResult]:
         """
         使用PySceneDetect检测场景变化
@@ -104,10 +299,11 @@ class SmartIntroDetector:
                 logger.info("PySceneDetect未安装，使用ffmpeg场景检测")
                 return self._detect_by_ffmpeg_scene(video_path)
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            # 输出保持为bytes，JSON解析器可以直接处理，省去一次解码
+            result = subprocess.run(cmd, capture_output=True)
             if result.returncode == 0:
                 # 解析JSON结果
-                scenes = json.loads(result.stdout)
+                scenes = orjson.loads(result.stdout) if orjson is not None else json.loads(result.stdout)
                 return self._analyze_scene_patterns(scenes)
                 
         except Exception as e:
@@ -118,27 +314,9 @@ class SmartIntroDetector:
     def _detect_by_ffmpeg_scene(self, video_path: Path) -> Optional[SmartDetectionResult]:
         """使用ffmpeg的场景检测作为后备方案"""
         
-        # 检测前3分钟的场景变化
-        cmd = [
-            "ffmpeg",
-            "-i", str(video_path),
-            "-t", "180",
-            "-vf", "select='gt(scene,0.3)',metadata=print:file=-",
-            "-f", "null", "-"
-        ]
-        
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            # 解析场景变化时间点
-            scene_times = []
-            for line in result.stderr.split('\n'):
-                if "pts_time:" in line:
-                    try:
-                        time_match = line.split("pts_time:")[1].split()[0]
-                        scene_times.append(float(time_match))
-                    except:
-                        pass
+            # 前3分钟的场景变化时间点来自共享的ffmpeg探测
+            scene_times = self._run_ffmpeg_probe(video_path)["scene_times"]
             
             if len(scene_times) > 0:
                 # 分析场景变化模式
@@ -149,6 +327,84 @@ class SmartIntroDetector:
         
         return None
     
+    def _run_ffmpeg_probe(self, video_path: Path) -> Dict[str, List[float]]:
+        """
+        用ffmpeg同时完成场景切换和静音检测
+        
+        视频走-vf场景选择，音频走-af静音检测，每段文件只解复用和解码一次；
+        缺少某一路流时对应的滤镜不生效，不影响另一路。
+        视频解码跳过非参考帧，场景检测按4fps进行，片头判断只需要秒级精度。
+        多核时把片头范围切成几段，各段用-ss定位后并行探测。
+        结果按视频路径、修改时间和大小缓存在实例上，供场景检测和音频检测共用
+        
+        Returns:
+            scene_times为场景切换时间列表，silence_ends为静音结束时间列表
+        """
+        # 场景检测和音频检测并行调用时，只有第一个调用真正运行ffmpeg
+        with self._probe_lock:
+            # 同一路径上的文件被替换后不能沿用之前的探测结果
+            key = file_identity(video_path)
+            if key is not None and self._probe_key == key:
+                return self._probe_result
+            
+            # 视频比片头上限短时只探测到视频结尾
+            window = min(float(self.max_intro), self._durations.get(key, float(self.max_intro)))
+            segment_count = max(1, min(self.probe_segments or os.cpu_count() or 1, _MAX_PROBE_SEGMENTS))
+            segment_length = window / segment_count
+            segments = [(i * segment_length, (i + 1) * segment_length) for i in range(segment_count)]
+            # 最后一段包含片头范围的终点
+            segments[-1] = (segments[-1][0], float("inf"))
+            
+            result = {"scene_times": [], "silence_ends": []}
+            with ThreadPoolExecutor(max_workers=segment_count) as executor:
+                partials = executor.map(lambda segment: self._probe_segment(video_path, *segment, window), segments)
+                for partial in partials:
+                    for name, values in partial.items():
+                        result[name].extend(values)
+            
+            self._probe_key = key
+            self._probe_result = result
+            return self._probe_result
+    
+    def _probe_segment(self, video_path: Path, own_start: float, own_end: float,
+                       window: float) -> Dict[str, List[float]]:
+        """
+        探测一段片头范围，只保留时间落在[own_start, own_end)内的事件
+        
+        实际探测范围向前后各多取_PROBE_OVERLAP秒：
+        向前多取保证跨段的静音也能满足最短时长，段首的场景切换也有前一帧可比；
+        向后多取使文件截断处伪造的静音结束点落在本段范围之外
+        """
+        seek = max(0.0, own_start - _PROBE_OVERLAP)
+        stop = min(window, own_end + _PROBE_OVERLAP)
+        
+        cmd = ["ffmpeg", "-hide_banner", "-nostats"]
+        if seek > 0:
+            cmd += ["-ss", f"{seek:g}"]
+        cmd += [
+            "-t", f"{stop - seek:g}",
+            "-skip_frame:v", "noref",
+            "-i", str(video_path),
+            "-vf", "fps=4,select='gt(scene,0.3)',showinfo",
+            "-af", "silencedetect=n=-30dB:d=3",
+            "-sn", "-dn",
+            "-f", "null", "-"
+        ]
+        
+        # 逐行读取stderr并解析，不缓冲完整输出；-ss定位后输出时间从0开始，需要加回偏移
+        result = {"scene_times": [], "silence_ends": []}
+        patterns = {"scene_times": _SCENE_TIME_RE, "silence_ends": _SILENCE_END_RE}
+        try:
+            for name, m in iter_ffmpeg_events(cmd, patterns):
+                time = round(float(m[1]) + seek, 6)
+                if own_start <= time < own_end:
+                    result[name].append(time)
+        except subprocess.CalledProcessError as e:
+            # 与之前一样保留已解析到的部分结果
+            logger.warning(f"ffmpeg探测返回错误({e.returncode})，使用已解析的部分结果")
+        
+        return result
+    
     def _analyze_scene_change_pattern(self, scene_times: List[float]) -> Optional[SmartDetectionResult]:
         """
         分析场景变化模式
@@ -157,52 +413,48 @@ class SmartIntroDetector:
         if len(scene_times) < 3:
             return None
         
-        # 计算场景变化密度（每10秒窗口）
-        windows = {}
-        for time in scene_times:
-            window = int(time // 10) * 10
-            windows[window] = windows.get(window, 0) + 1
-        
-        # 找到密度显著下降的点
-        sorted_windows = sorted(windows.keys())
-        for i in range(len(sorted_windows) - 1):
-            current = sorted_windows[i]
-            next_w = sorted_windows[i + 1]
-            
-            # 密度下降超过50%
-            if windows[current] >= 3 and windows[next_w] <= 1:
-                # 在下一个窗口找到精确的场景变化点
-                for time in scene_times:
-                    if time > current + 10:
-                        if self.min_intro <= time <= self.max_intro:
-                            return SmartDetectionResult(
-                                intro_end_seconds=time,
-                                outro_start_seconds=None,
-                                confidence=0.75,
-                                method="scene_pattern",
-                                details={
-                                    "high_density_window": current,
-                                    "low_density_window": next_w,
-                                    "scene_count": len(scene_times)
-                                }
-                            )
+        times = np.sort(np.asarray(scene_times, dtype=np.float64))
+        
+        # 计算场景变化密度（每10秒窗口），找到密度显著下降的点
+        counts = self._calculate_density(times)
+        drops = np.flatnonzero((counts[:-1] >= 3) & (counts[1:] <= 1))
+        
+        # 片头结束点须在片头时长范围内
+        first_valid = int(np.searchsorted(times, self.min_intro, side='left'))
+        for window_idx in drops:
+            current = int(window_idx) * 10
+            # 在下一个窗口找到精确的场景变化点
+            idx = max(int(np.searchsorted(times, current + 10, side='right')), first_valid)
+            if idx < len(times) and times[idx] <= self.max_intro:
+                return SmartDetectionResult(
+                    intro_end_seconds=float(times[idx]),
+                    outro_start_seconds=None,
+                    confidence=0.75,
+                    method="scene_pattern",
+                    details={
+                        "high_density_window": current,
+                        "low_density_window": current + 10,
+                        "scene_count": len(scene_times)
+                    }
+                )
         
         # 备选：找最长的场景间隔
-        if len(scene_times) >= 2:
-            gaps = [(scene_times[i+1] - scene_times[i], scene_times[i+1]) 
-                    for i in range(len(scene_times)-1)]
-            gaps.sort(reverse=True)
+        if len(times) >= 2:
+            gaps = np.diff(times)
+            # 间隔相同时取较晚的一个
+            i = len(gaps) - 1 - int(np.argmax(gaps[::-1]))
+            gap_duration = float(gaps[i])
             
             # 最长间隔超过15秒，可能是片头结束
-            if gaps[0][0] > 15:
-                time = gaps[0][1]
+            if gap_duration > 15:
+                time = float(times[i + 1])
                 if self.min_intro <= time <= self.max_intro:
                     return SmartDetectionResult(
                         intro_end_seconds=time,
                         outro_start_seconds=None,
                         confidence=0.65,
                         method="scene_gap",
-                        details={"gap_duration": gaps[0][0]}
+                        details={"gap_duration": gap_duration}
                     )
         
         return None
@@ -215,34 +467,38 @@ class SmartIntroDetector:
         - 检测logo
         """
         try:
-            cap = cv2.VideoCapture(str(video_path))
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            
-            # 采样分析（每秒1帧）
-            frame_interval = int(fps)
-            frame_count = 0
             black_frames = []
             text_frames = []
             
-            while cap.isOpened() and frame_count < self.max_intro * fps:
-                ret, frame = cap.read()
-                if not ret:
+            last_window = None
+            
+            # 采样分析（每秒1帧）
+            for current_time, is_black, has_text in self._iter_frame_features(video_path):
+                # 检测黑屏
+                if is_black:
+                    black_frames.append(current_time)
+                
+                # 检测文字（简单的边缘检测）
+                if has_text:
+                    text_frames.append(current_time)
+                
+                if not self.early_exit_on_black:
+                    continue
+                
+                # 片头范围内的一段黑屏结束，结果已经确定
+                if not is_black and black_frames and black_frames[-1] >= self.min_intro:
                     break
                 
-                if frame_count % frame_interval == 0:
-                    current_time = frame_count / fps
-                    
-                    # 检测黑屏
-                    if self._is_black_frame(frame):
-                        black_frames.append(current_time)
-                    
-                    # 检测文字（简单的边缘检测）
-                    if self._has_text(frame):
-                        text_frames.append(current_time)
+                # 每进入一个新的10秒窗口检查一次文字密度，
+                # 下降点之后连续两个窗口都已采样完时提前结束
+                window = int(current_time // 10)
+                if window == last_window:
+                    continue
+                last_window = window
                 
-                frame_count += 1
-            
-            cap.release()
+                drop_point = self._find_density_drop(self._calculate_density(text_frames)) if text_frames else None
+                if drop_point and self.min_intro <= drop_point <= self.max_intro and current_time >= drop_point + 20:
+                    break
             
             # 分析黑屏模式
             if black_frames:
@@ -277,35 +533,192 @@ class SmartIntroDetector:
         
         return None
     
-    def _is_black_frame(self, frame: np.ndarray, threshold: int = 10) -> bool:
-        """检测是否为黑屏"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        return np.mean(gray) < threshold
+    def _iter_frame_features(self, video_path: Path) -> Iterator[Tuple[float, bool, bool]]:
+        """
+        逐个采样帧计算视觉特征，有可用的CUDA设备时在GPU上解码和计算
+        
+        Yields:
+            (时间秒数, 是否黑屏, 是否有文字)
+        """
+        if _cuda_decode_available():
+            try:
+                reader = cv2.cudacodec.createVideoReader(str(video_path))
+            except cv2.error as e:
+                logger.info(f"GPU解码不可用，改用CPU解码: {e}")
+            else:
+                yield from self._iter_frame_features_cuda(video_path, reader)
+                return
+        
+        gray = edge_buf = None
+        for current_time, frame in self._iter_sampled_frames(video_path):
+            # 各帧尺寸相同，灰度图和边缘检测的输出缓冲区只分配一次
+            if gray is None or gray.shape != frame.shape[:2]:
+                gray = np.empty(frame.shape[:2], dtype=np.uint8)
+                edge_buf = np.empty(frame.shape[:2], dtype=np.uint8)
+            
+            # 黑屏和文字检测共用同一张灰度图
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+            yield current_time, self._is_black_frame(gray), self._has_text(gray, edge_buf)
     
-    def _has_text(self, frame: np.ndarray) -> bool:
-        """简单的文字检测（基于边缘）"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 50, 150)
+    def _iter_frame_features_cuda(self, video_path: Path, reader) -> Iterator[Tuple[float, bool, bool]]:
+        """
+        使用cudacodec在GPU上解码并计算视觉特征
+        
+        画面始终留在显存中，只取回均值、极值和边缘像素数等标量；
+        与CPU路径一样，高于1080p的画面缩小到1080p再分析
+        """
+        cap = cv2.VideoCapture(str(video_path))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+        
+        frame_interval = int(fps)
+        canny = cv2.cuda.createCannyEdgeDetector(50, 150)
+        frame_count = 0
+        
+        while frame_count < self.max_intro * fps:
+            if frame_count % frame_interval == 0:
+                ret, frame = reader.nextFrame()
+                if not ret:
+                    break
+                gray = cv2.cuda.cvtColor(frame, cv2.COLOR_BGRA2GRAY)
+                size = _analysis_size(*gray.size())
+                if size is not None:
+                    gray = cv2.cuda.resize(gray, size, interpolation=cv2.INTER_AREA)
+                yield frame_count / fps, self._is_black_frame_cuda(gray), self._has_text_cuda(gray, canny)
+            elif not reader.grab():
+                break
+            
+            frame_count += 1
+    
+    def _iter_sampled_frames(self, video_path: Path) -> Iterator[Tuple[float, np.ndarray]]:
+        """
+        按每秒1帧采样片头范围内的画面，高于1080p的画面缩小到1080p再分析
+        
+        Yields:
+            (时间秒数, BGR图像)
+        """
+        if av is not None:
+            yield from self._iter_sampled_frames_pyav(video_path)
+            return
+        
+        cap = cv2.VideoCapture(str(video_path))
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            frame_interval = int(fps)
+            frame_count = 0
+            
+            while cap.isOpened() and frame_count < self.max_intro * fps:
+                if frame_count % frame_interval == 0:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    size = _analysis_size(frame.shape[1], frame.shape[0])
+                    if size is not None:
+                        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                    yield frame_count / fps, frame
+                # 非采样帧只grab，不做颜色转换和拷贝
+                elif not cap.grab():
+                    break
+                
+                frame_count += 1
+        finally:
+            cap.release()
+    
+    def _iter_sampled_frames_pyav(self, video_path: Path) -> Iterator[Tuple[float, np.ndarray]]:
+        """
+        使用PyAV采样画面
+        
+        解码仍需逐帧进行，但只有采样到的帧才做YUV到BGR的转换并交给Python，
+        按帧时间戳采样，可变帧率的视频也能保持每秒1帧
+        """
+        with av.open(str(video_path)) as container:
+            if not container.streams.video:
+                return
+            
+            stream = container.streams.video[0]
+            stream.thread_type = 'AUTO'
+            start = float(stream.start_time * stream.time_base) if stream.start_time is not None else 0.0
+            next_sample = 0.0
+            
+            for frame in container.decode(stream):
+                if frame.time is None:
+                    continue
+                current_time = frame.time - start
+                if current_time >= self.max_intro:
+                    break
+                if current_time < next_sample:
+                    continue
+                
+                # 缩小和转BGR在swscale中一步完成
+                size = _analysis_size(frame.width, frame.height)
+                if size is None:
+                    image = frame.to_ndarray(format='bgr24')
+                else:
+                    image = frame.to_ndarray(width=size[0], height=size[1], format='bgr24', interpolation='AREA')
+                
+                yield current_time, image
+                next_sample = int(current_time) + 1
+    
+    def _is_black_frame(self, gray: np.ndarray, threshold: int = 10, block_range: int = 4) -> bool:
+        """
+        检测灰度图是否为黑屏
+        
+        除平均亮度外，还要求画面均匀：按8x8块取平均后，
+        各块亮度的最大差值小于block_range，避免把偏暗但有内容的画面当成黑屏
+        """
+        # 先看四角和中心5个像素，明显不是黑屏的画面无需整帧计算
+        h, w = gray.shape[:2]
+        if gray[[0, 0, -1, -1, h // 2], [0, -1, 0, -1, w // 2]].mean() > 4 * threshold:
+            return False
+        
+        # cv2.mean是向量化的C实现，比np.mean快
+        if cv2.mean(gray)[0] >= threshold:
+            return False
+        
+        blocks = cv2.resize(gray, (0, 0), fx=0.125, fy=0.125, interpolation=cv2.INTER_AREA)
+        min_val, max_val, _, _ = cv2.minMaxLoc(blocks)
+        return max_val - min_val < block_range
+    
+    def _has_text(self, gray: np.ndarray, edge_buf: Optional[np.ndarray] = None) -> bool:
+        """
+        简单的文字检测（基于边缘）
+        
+        edge_buf为可复用的边缘图输出缓冲区（uint8），尺寸与gray相同
+        """
+        edge_buf = cv2.Canny(gray, 50, 150, edges=edge_buf)
         # 边缘像素比例高可能有文字
-        edge_ratio = np.sum(edges > 0) / edges.size
+        edge_ratio = cv2.countNonZero(edge_buf) / gray.size
         return edge_ratio > 0.02
     
-    def _calculate_density(self, times: List[float], window: float = 10) -> Dict[int, int]:
-        """计算时间密度"""
-        density = {}
-        for time in times:
-            window_idx = int(time // window)
-            density[window_idx] = density.get(window_idx, 0) + 1
-        return density
+    def _is_black_frame_cuda(self, gray, threshold: int = 10, block_range: int = 4) -> bool:
+        """_is_black_frame的GPU版本，输入为灰度GpuMat"""
+        width, height = gray.size()
+        if cv2.cuda.sum(gray)[0] / (width * height) >= threshold:
+            return False
+        
+        blocks = cv2.cuda.resize(gray, (max(1, width // 8), max(1, height // 8)), interpolation=cv2.INTER_AREA)
+        min_val, max_val = cv2.cuda.minMax(blocks)
+        return max_val - min_val < block_range
+    
+    def _has_text_cuda(self, gray, canny) -> bool:
+        """_has_text的GPU版本，输入为灰度GpuMat"""
+        edges = canny.detect(gray)
+        width, height = gray.size()
+        edge_ratio = cv2.cuda.countNonZero(edges) / (width * height)
+        return edge_ratio > 0.02
     
-    def _find_density_drop(self, density: Dict[int, int], drop_ratio: float = 0.5) -> Optional[float]:
+    def _calculate_density(self, times, window: float = 10) -> np.ndarray:
+        """计算时间密度，返回每个窗口内的数量，下标为窗口序号"""
+        window_idx = (np.asarray(times, dtype=np.float64) // window).astype(np.int64)
+        return np.bincount(window_idx)
+    
+    def _find_density_drop(self, density: np.ndarray, drop_ratio: float = 0.5) -> Optional[float]:
         """找到密度显著下降的点"""
-        windows = sorted(density.keys())
-        for i in range(len(windows) - 1):
-            current = density[windows[i]]
-            next_val = density.get(windows[i+1], 0)
-            if current >= 3 and next_val / current < drop_ratio:
-                return (windows[i] + 1) * 10  # 返回下一个窗口的开始时间
+        current = density[:-1]
+        ratio = density[1:] / np.maximum(current, 1)
+        drops = np.flatnonzero((current >= 3) & (ratio < drop_ratio))
+        if drops.size:
+            return (int(drops[0]) + 1) * 10  # 返回下一个窗口的开始时间
         return None
     
     def _detect_by_audio_features(self, video_path: Path) -> Optional[SmartDetectionResult]:
@@ -315,38 +728,15 @@ class SmartIntroDetector:
         - 静音检测
         - 音频能量分析
         """
-        cmd = [
-            "ffmpeg",
-            "-i", str(video_path),
-            "-t", str(self.max_intro),
-            "-af", "volumedetect",
-            "-f", "null", "-"
-        ]
-        
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            # 静音段来自共享的ffmpeg探测
+            silence_ends = self._run_ffmpeg_probe(video_path)["silence_ends"]
             
-            # 检测静音段
-            silence_cmd = [
-                "ffmpeg",
-                "-i", str(video_path),
-                "-t", str(self.max_intro),
-                "-af", "silencedetect=n=-30dB:d=3",
-                "-f", "null", "-"
-            ]
-            
-            silence_result = subprocess.run(silence_cmd, capture_output=True, text=True)
-            
-            # 解析静音段
+            # 取片头范围内最后一个静音结束点
             silence_end = None
-            for line in silence_result.stderr.split('\n'):
-                if "silence_end" in line:
-                    try:
-                        time = float(line.split("silence_end: ")[1].split()[0])
-                        if self.min_intro <= time <= self.max_intro:
-                            silence_end = time
-                    except:
-                        pass
+            for time in silence_ends:
+                if self.min_intro <= time <= self.max_intro:
+                    silence_end = time
             
             if silence_end:
                 return SmartDetectionResult(
@@ -402,4 +792,8 @@ class SmartIntroDetector:
         """
         # TODO: 实现视频指纹匹配
         # 可以使用 videohash 或 imagehash 库
-        pass
\ No newline at end of file
+        pass
+
+def _detect_in_worker(detector_cls: type, video_path: Path, probe_segments: int) -> SmartDetectionResult:
+    """批量检测的子进程入口，检测器含有线程锁无法跨进程传递，在子进程中创建"""
+    return detector_cls(probe_segments=probe_segments).detect(video_path)
\ No newline at end of file
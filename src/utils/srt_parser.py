@@ -0,0 +1,59 @@
+"""
+SRT解析工具 - 片头检测器共用的字幕读取
+"""
+import mmap
+import os
+import re
+from typing import Tuple, List
+from pathlib import Path
+import numpy as np
+
+# SRT字幕块：序号行、时间码行、若干行非空文本（按字节匹配，只解码文本部分）
+# 只有空行结束字幕块，只含空白的文本行仍属于当前字幕
+_SRT_RE = re.compile(
+    rb"^(?:\xef\xbb\xbf)?(\d+)[ \t\r]*\n"
+    rb"(\d+):(\d\d):(\d\d)[,.](\d{3})[ \t]*-->[ \t]*(\d+):(\d\d):(\d\d)[,.](\d{3})[^\n]*\n"
+    rb"((?:\r?[^\r\n][^\n]*(?:\n|\Z))+)",
+    re.MULTILINE
+)
+
+def parse_srt_cues(srt_path: Path) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    解析SRT文件
+    
+    文件通过mmap映射后直接按字节匹配，不整体解码为字符串
+    
+    Args:
+        srt_path: SRT文件路径
+    
+    Returns:
+        (开始时间数组, 结束时间数组, 字幕文本列表)，三者按下标一一对应并按开始时间排序
+    """
+    starts = []
+    ends = []
+    texts = []
+    # 空文件无法mmap
+    if os.path.getsize(srt_path) > 0:
+        with open(srt_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for m in _SRT_RE.finditer(mm):
+                # 获取字幕文本，只解码这一部分；文本全为空白的字幕跳过
+                text = m[10].decode('utf-8').strip()
+                if not text:
+                    continue
+                
+                # 直接用时间码的数字分组计算秒数
+                starts.append(int(m[2]) * 3600 + int(m[3]) * 60 + int(m[4]) + int(m[5]) / 1000)
+                ends.append(int(m[6]) * 3600 + int(m[7]) * 60 + int(m[8]) + int(m[9]) / 1000)
+                texts.append(' '.join(line.strip() for line in text.split('\n')))
+    
+    starts = np.array(starts, dtype=np.float64)
+    ends = np.array(ends, dtype=np.float64)
+    
+    # SRT通常已按时间排序，只有出现乱序时才排序
+    if np.any(np.diff(starts) < 0):
+        order = np.argsort(starts, kind='stable')
+        starts = starts[order]
+        ends = ends[order]
+        texts = [texts[i] for i in order]
+    
+    return starts, ends, texts
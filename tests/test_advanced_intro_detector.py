@@ -0,0 +1,340 @@
+"""
+高级片头检测器单元测试
+"""
+import numpy as np
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+
+from src.utils.advanced_intro_detector import AdvancedIntroDetector, IntroDetectionResult
+
+
+SAMPLE_RATE = 16000
+
+
+def _white_noise(seconds, seed=0):
+    """宽频带的平稳噪声，频谱质心约在奈奎斯特频率的一半"""
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(seconds * SAMPLE_RATE) * 0.3).astype(np.float32)
+
+
+def _voiced_bursts(seconds, seed=0):
+    """类似浊音的平稳信号：长短不一的谐波音节，中间夹着短暂停顿"""
+    rng = np.random.default_rng(seed)
+    total = seconds * SAMPLE_RATE
+    out = np.zeros(total, dtype=np.float32)
+    pos = 0
+    while pos < total:
+        length = min(int(SAMPLE_RATE * rng.uniform(0.08, 0.35)), total - pos)
+        f0 = rng.uniform(100, 220)
+        t = np.arange(length) / SAMPLE_RATE
+        burst = sum(np.sin(2 * np.pi * f0 * h * t) / h ** 1.5 for h in range(1, 15))
+        out[pos:pos + length] = burst * np.hanning(length)
+        pos += length + int(SAMPLE_RATE * rng.uniform(0.03, 0.3))
+    return out / np.abs(out).max()
+
+
+def _detector_with_samples(samples):
+    """返回一个直接使用给定采样、不读取视频文件的检测器"""
+    detector = AdvancedIntroDetector()
+    detector._read_audio_samples = lambda video_path, sample_rate: samples
+    return detector
+
+
+class TestMusicToSpeechTransition:
+    """测试频谱质心转换点检测"""
+    
+    @pytest.mark.parametrize("samples", [
+        _white_noise(150),
+        _voiced_bursts(150),
+    ], ids=["white_noise", "voiced_bursts"])
+    def test_stationary_input_has_no_transition(self, samples):
+        """平稳信号不应检测出转换点"""
+        detector = _detector_with_samples(samples)
+        assert detector._detect_music_to_speech_transition(None) is None
+    
+    def test_sustained_centroid_drop_is_detected(self):
+        """宽频带信号持续转为低频信号时，在转换处检测到片头结束"""
+        samples = np.concatenate([_white_noise(45), _voiced_bursts(105)])
+        detector = _detector_with_samples(samples)
+        
+        result = detector._detect_music_to_speech_transition(None)
+        
+        assert result is not None
+        assert result.detection_method == "music_analysis"
+        assert abs(result.details["transition_point"] - 45) < 1
+        assert result.details["centroid_shift_hz"] > 200
+    
+    def test_short_input_returns_none(self):
+        """音频不足两个平滑窗口时不做判断"""
+        detector = _detector_with_samples(_white_noise(1))
+        assert detector._detect_music_to_speech_transition(None) is None
+
+
+def _result(seconds, confidence, method):
+    """构造检测结果"""
+    return IntroDetectionResult(intro_end_seconds=seconds, confidence=confidence,
+                                detection_method=method, details={})
+
+
+class TestDetectIntro:
+    """测试多策略结果的综合"""
+    
+    def test_later_strategy_with_higher_confidence_wins(self):
+        """排在前面的策略置信度较低时，采用后面更可靠的结果"""
+        detector = AdvancedIntroDetector()
+        with patch.object(detector, "_detect_by_audio_features",
+                          return_value=_result(49, 0.6, "music_analysis")), \
+             patch.object(detector, "_detect_by_video_features",
+                          return_value=_result(40, 0.8, "black_screen")):
+            result = detector.detect_intro(Path("video.mp4"))
+        
+        assert result.detection_method == "black_screen"
+        assert result.intro_end_seconds == 40
+    
+    def test_equal_confidence_keeps_strategy_order(self):
+        """置信度相同时采用排在前面的策略"""
+        detector = AdvancedIntroDetector()
+        with patch.object(detector, "_detect_by_audio_features",
+                          return_value=_result(35, 0.8, "audio_silence")), \
+             patch.object(detector, "_detect_by_video_features",
+                          return_value=_result(40, 0.8, "black_screen")):
+            result = detector.detect_intro(Path("video.mp4"))
+        
+        assert result.detection_method == "audio_silence"
+    
+    def test_all_strategies_fail_returns_default(self):
+        """所有策略都没有结果时使用默认片头时长"""
+        detector = AdvancedIntroDetector()
+        with patch.object(detector, "_detect_by_audio_features", return_value=None), \
+             patch.object(detector, "_detect_by_video_features", side_effect=RuntimeError("boom")):
+            result = detector.detect_intro(Path("video.mp4"))
+        
+        assert result.detection_method == "default"
+        assert result.intro_end_seconds == detector.default_intro_duration
+
+
+class TestProbeMemo:
+    """测试实例上的探测结果复用"""
+    
+    def test_replaced_file_is_probed_again(self, tmp_path):
+        """同一路径上的文件被替换后重新探测"""
+        video_path = tmp_path / "video.mp4"
+        video_path.write_bytes(b"old")
+        detector = AdvancedIntroDetector()
+        
+        with patch.object(detector, "_probe_cache_path", return_value=None), \
+             patch.object(detector, "_collect_probe_events",
+                          return_value={"silence_periods": [], "scene_changes": [], "black_periods": []}) as collect:
+            detector._run_ffmpeg_probe(video_path)
+            detector._run_ffmpeg_probe(video_path)
+            assert collect.call_count == 1
+            
+            video_path.write_bytes(b"replaced")
+            detector._run_ffmpeg_probe(video_path)
+            assert collect.call_count == 2
+
+
+def _probe(silence_periods=(), scene_changes=(), black_periods=()):
+    """构造共享ffmpeg探测的结果"""
+    return {"silence_periods": list(silence_periods), "scene_changes": list(scene_changes),
+            "black_periods": list(black_periods)}
+
+
+def _reference_audio_silence(detector, silence_periods):
+    """逐段比较静音时长的参考实现，返回(片头结束秒数, 静音时长)"""
+    longest = None
+    for start, end in silence_periods:
+        if detector.min_intro_duration <= end <= detector.max_intro_duration:
+            if longest is None or end - start > longest[1] - longest[0]:
+                longest = (start, end)
+    if longest and longest[1] - longest[0] > 3:
+        return int(longest[1]), longest[1] - longest[0]
+    return None
+
+
+class TestAudioFeatures:
+    """测试基于静音段的音频特征检测"""
+    
+    def test_matches_reference_on_random_silences(self):
+        """随机静音段上选出的片头结束点与参考实现一致"""
+        rng = np.random.default_rng(0)
+        detector = AdvancedIntroDetector()
+        for _ in range(300):
+            starts = np.sort(np.round(rng.uniform(0, 180, size=int(rng.integers(0, 8))), 3))
+            periods = [(float(s), float(s + round(rng.uniform(0, 8), 3))) for s in starts]
+            
+            with patch.object(detector, "_run_ffmpeg_probe", return_value=_probe(silence_periods=periods)), \
+                 patch.object(detector, "_detect_music_to_speech_transition", return_value=None):
+                result = detector._detect_by_audio_features(Path("video.mp4"))
+            
+            expected = _reference_audio_silence(detector, periods)
+            if expected is None:
+                assert result is None
+            else:
+                assert result.detection_method == "audio_silence"
+                assert result.intro_end_seconds == expected[0]
+                assert result.details["silence_duration"] == pytest.approx(expected[1])
+    
+    def test_falls_back_to_music_analysis(self):
+        """片头范围内没有超过3秒的静音时改用频谱质心分析"""
+        detector = AdvancedIntroDetector()
+        fallback = _result(45, 0.6, "music_analysis")
+        periods = [(10.0, 20.0), (40.0, 42.5), (160.0, 170.0)]
+        
+        with patch.object(detector, "_run_ffmpeg_probe", return_value=_probe(silence_periods=periods)), \
+             patch.object(detector, "_detect_music_to_speech_transition", return_value=fallback):
+            result = detector._detect_by_audio_features(Path("video.mp4"))
+        
+        assert result is fallback
+
+
+def _reference_video_features(detector, scene_changes, black_periods):
+    """按窗口字典逐个比较的参考实现，返回(方法, 片头结束秒数)；空窗口按0次计入"""
+    for _, end_time in black_periods:
+        if end_time >= detector.min_intro_duration:
+            return "black_screen", int(end_time)
+    if len(scene_changes) <= 5:
+        return None
+    density = {}
+    for change_time in scene_changes:
+        window = int(change_time // 10) * 10
+        density[window] = density.get(window, 0) + 1
+    for current in range(0, max(density), 10):
+        if (detector.min_intro_duration <= current <= detector.max_intro_duration and
+                density.get(current, 0) >= 3 and density.get(current + 10, 0) <= 1):
+            for change_time in scene_changes:
+                if change_time > current + 10:
+                    return "scene_density_drop", int(change_time)
+    for i in range(1, len(scene_changes)):
+        if scene_changes[i] >= detector.min_intro_duration and scene_changes[i] - scene_changes[i - 1] > 15:
+            return "scene_gap", int(scene_changes[i])
+    return None
+
+
+class TestVideoFeatures:
+    """测试基于黑屏和场景切换的视频特征检测"""
+    
+    def _detect(self, detector, scene_changes, black_periods=()):
+        with patch.object(detector, "_run_ffmpeg_probe",
+                          return_value=_probe(scene_changes=scene_changes, black_periods=black_periods)):
+            return detector._detect_by_video_features(Path("video.mp4"))
+    
+    def test_matches_reference_on_random_scenes(self):
+        """随机场景切换上的检测结果与参考实现一致"""
+        rng = np.random.default_rng(0)
+        detector = AdvancedIntroDetector()
+        for _ in range(300):
+            counts = rng.choice([0, 0, 1, 2, 3, 4, 5], size=int(rng.integers(1, 16)))
+            scene_changes = sorted(round(float(w * 10 + rng.uniform(0, 10)), 3)
+                                   for w, count in enumerate(counts) for _ in range(count))
+            black_periods = [(10.0, float(rng.uniform(12, 60)))] if rng.random() < 0.2 else []
+            
+            result = self._detect(detector, scene_changes, black_periods)
+            
+            expected = _reference_video_features(detector, scene_changes, black_periods)
+            if expected is None:
+                assert result is None
+            else:
+                assert (result.detection_method, result.intro_end_seconds) == expected
+    
+    def test_empty_window_counts_as_drop(self):
+        """密集窗口后面紧跟空窗口时视为密度下降"""
+        detector = AdvancedIntroDetector()
+        scene_changes = [31.0, 33.0, 35.0, 37.0, 52.0, 54.0, 56.0, 58.0]
+        
+        result = self._detect(detector, scene_changes)
+        
+        assert result.detection_method == "scene_density_drop"
+        assert result.intro_end_seconds == 52
+        assert result.details["density_before"] == 4
+        assert result.details["density_after"] == 0
+
+
+_SUBTITLE_POOL = [
+    "♪ 啦啦啦 ♪", "[Music]", "(music) 间奏", "导演 张三", "Produced by ACME Pictures",
+    "你好", "走吧", "我们今天要去城里看看，你要不要和我们一起去那边？",
+    "Where have you been all this time, my old friend?",
+    "这是一句没有任何标点符号的很长很长很长很长的字幕文本内容",
+    "[music] We should really get going now, shouldn't we?",
+    "(MUSIC) Somebody left the lights on in the hallway again.",
+]
+
+
+def _write_srt(srt_path, starts, texts):
+    """把字幕写成SRT文件，每条字幕持续2秒"""
+    blocks = []
+    for i, (start, text) in enumerate(zip(starts, texts), 1):
+        begin, end = (f"00:{int(t // 60):02d}:{int(t % 60):02d},{int(round(t % 1 * 1000)) % 1000:03d}"
+                      for t in (start, start + 2))
+        blocks.append(f"{i}\n{begin} --> {end}\n{text}\n")
+    srt_path.write_text("\n".join(blocks), encoding="utf-8")
+
+
+def _reference_subtitle_features(detector, starts, texts):
+    """逐条计分和查找对话的参考实现，返回(片头结束秒数, 置信度, 歌词得分, 演职员得分, 对话文本)"""
+    lyric_markers = ['♪', '♫', '[音乐]', '[music]', '(music)']
+    lyrics_score = credits_score = 0
+    for i, text in enumerate(texts[:20]):
+        lowered = text.lower()
+        if any(marker in lowered for marker in lyric_markers):
+            lyrics_score += 1
+        if any(keyword in lowered for keyword in ['出品', '制作', '导演', '主演', '编剧',
+                                                  'produced', 'directed', 'written']):
+            credits_score += 1
+        if len(text) < 20 and i > 0 and len(texts[i - 1]) < 20:
+            lyrics_score += 0.5
+    for start, text in zip(starts, texts):
+        # 所有歌词标记都排除，包括[music]和(music)
+        if (len(text) > 20 and any(p in text for p in '。，？！.,?!') and
+                not any(marker in text.lower() for marker in lyric_markers) and
+                start >= detector.min_intro_duration):
+            confidence = 0.8 if (lyrics_score > 3 or credits_score > 2) else 0.6
+            return int(start), confidence, lyrics_score, credits_score, text[:50]
+    return None
+
+
+class TestSubtitleFeatures:
+    """测试基于字幕内容的片头检测"""
+    
+    def test_matches_reference_on_random_subtitles(self, tmp_path):
+        """随机字幕上的检测结果与参考实现一致"""
+        rng = np.random.default_rng(0)
+        detector = AdvancedIntroDetector()
+        srt_path = tmp_path / "subtitle.srt"
+        for _ in range(200):
+            count = int(rng.integers(1, 30))
+            starts = np.sort(np.round(rng.uniform(0, 120, size=count), 3)).tolist()
+            texts = [_SUBTITLE_POOL[i] for i in rng.integers(0, len(_SUBTITLE_POOL), size=count)]
+            _write_srt(srt_path, starts, texts)
+            
+            result = detector._detect_by_subtitle_features(srt_path)
+            
+            expected = _reference_subtitle_features(detector, starts, texts)
+            if expected is None:
+                assert result is None
+                continue
+            intro_end, confidence, lyrics_score, credits_score, first_dialogue = expected
+            assert result.intro_end_seconds == intro_end
+            assert result.confidence == confidence
+            assert result.details["first_dialogue"] == first_dialogue
+            # 两项得分都超过阈值后停止计分，此时只要求得分同样超过阈值
+            if lyrics_score > 3 and credits_score > 2:
+                assert result.details["lyrics_score"] > 3 and result.details["credits_score"] > 2
+            else:
+                assert result.details["lyrics_score"] == lyrics_score
+                assert result.details["credits_score"] == credits_score
+    
+    def test_music_marked_cue_is_not_first_dialogue(self, tmp_path):
+        """带[music]或(music)标记的字幕不作为第一段对话"""
+        srt_path = tmp_path / "subtitle.srt"
+        _write_srt(srt_path, [35.0, 40.0, 45.0], [
+            "[Music] We should really get going now, shouldn't we?",
+            "(music) Somebody left the lights on in the hallway again.",
+            "Where have you been all this time, my old friend?",
+        ])
+        
+        result = AdvancedIntroDetector()._detect_by_subtitle_features(srt_path)
+        
+        assert result.intro_end_seconds == 45
+        assert result.details["first_dialogue"] == "Where have you been all this time, my old friend?"
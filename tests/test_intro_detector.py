@@ -0,0 +1,122 @@
+"""
+片头检测器单元测试
+"""
+import numpy as np
+
+from src.utils.intro_detector import IntroDetector
+
+
+def _reference_dialogue_density(detector, subtitles):
+    """逐条推进窗口的参考实现"""
+    current_window_start = 0
+    dialogue_count = 0
+    for subtitle in subtitles:
+        while subtitle['start'] >= current_window_start + 10:
+            if dialogue_count / 10 >= detector.min_dialogue_density:
+                return int(current_window_start)
+            current_window_start += 10
+            dialogue_count = 0
+        if subtitle['start'] >= current_window_start and len(subtitle['text'].strip()) > 5:
+            dialogue_count += 1
+    return -1
+
+
+def _reference_silence_break(detector, subtitles):
+    """逐对比较字幕间隔的参考实现"""
+    if subtitles[0]['start'] >= detector.min_intro_duration:
+        return int(subtitles[0]['start'])
+    for i in range(len(subtitles) - 1):
+        if subtitles[i + 1]['start'] - subtitles[i]['end'] >= detector.silence_threshold:
+            return int(subtitles[i + 1]['start'])
+    return -1
+
+
+def _random_cues(rng):
+    """生成按开始时间排序的随机字幕，返回(starts, ends, texts)"""
+    count = int(rng.integers(1, 40))
+    starts = np.sort(np.round(rng.uniform(0, 200, size=count), 3))
+    ends = starts + np.round(rng.uniform(0.5, 5, size=count), 3)
+    texts = ["字" * int(n) + " " * int(rng.integers(0, 3)) for n in rng.integers(0, 10, size=count)]
+    return starts, ends, texts
+
+
+class TestAdjustSrtTimeline:
+    """测试字幕时间轴调整"""
+    
+    def test_shift_uses_exact_milliseconds(self, tmp_path):
+        """偏移按整数毫秒计算，不受浮点误差影响"""
+        srt_path = tmp_path / "subtitle.srt"
+        srt_path.write_bytes(b"1\n00:01:05,300 --> 00:01:07,900\ntext\n")
+        
+        IntroDetector().adjust_srt_timeline(srt_path, 60.1)
+        
+        assert srt_path.read_bytes() == b"1\n00:00:05,200 --> 00:00:07,800\ntext"
+    
+    def test_drops_cues_inside_intro_and_renumbers(self, tmp_path):
+        """片头内结束的字幕被删除，跨越片头的字幕从0开始，剩余字幕重新编号"""
+        srt_path = tmp_path / "subtitle.srt"
+        srt_path.write_bytes(
+            "1\n00:00:05,000 --> 00:00:08,000\n片头歌词\n\n"
+            "2\n00:00:08,500 --> 00:00:10,000\n片头结束\n\n"
+            "3\n00:00:09,000 --> 00:00:12,000\n跨越片头\n\n"
+            "4\n01:00:00,000 --> 01:00:01,500\n正文\n第二行\n".encode("utf-8")
+        )
+        
+        IntroDetector().adjust_srt_timeline(srt_path, 10)
+        
+        assert srt_path.read_text(encoding="utf-8") == (
+            "1\n00:00:00,000 --> 00:00:02,000\n跨越片头\n\n"
+            "2\n00:59:50,000 --> 00:59:51,500\n正文\n第二行"
+        )
+    
+    def test_crlf_is_preserved(self, tmp_path):
+        """CRLF换行的文件输出仍使用CRLF"""
+        srt_path = tmp_path / "subtitle.srt"
+        srt_path.write_bytes(
+            b"1\r\n00:00:01,000 --> 00:00:02,000\r\nintro\r\n\r\n"
+            b"2\r\n00:00:30,000 --> 00:00:31,000\r\nfirst\r\nsecond\r\n"
+        )
+        
+        IntroDetector().adjust_srt_timeline(srt_path, 20)
+        
+        assert srt_path.read_bytes() == b"1\r\n00:00:10,000 --> 00:00:11,000\r\nfirst\r\nsecond"
+    
+    def test_writes_to_output_path(self, tmp_path):
+        """指定输出路径时不修改原文件"""
+        srt_path = tmp_path / "subtitle.srt"
+        original = b"1\n00:00:30,000 --> 00:00:31,000\ntext\n"
+        srt_path.write_bytes(original)
+        output_path = tmp_path / "adjusted.srt"
+        
+        result = IntroDetector().adjust_srt_timeline(srt_path, 5, output_path)
+        
+        assert result == output_path
+        assert srt_path.read_bytes() == original
+        assert output_path.read_bytes() == b"1\n00:00:25,000 --> 00:00:26,000\ntext"
+
+
+
+class TestDetectStrategies:
+    """与逐条遍历的参考实现比较两种检测策略"""
+    
+    def test_matches_reference_on_random_cues(self):
+        """随机字幕上的检测结果与参考实现一致"""
+        rng = np.random.default_rng(0)
+        for _ in range(500):
+            detector = IntroDetector(min_dialogue_density=float(rng.choice([0.1, 0.3, 0.5])),
+                                     silence_threshold=int(rng.integers(5, 40)))
+            starts, ends, texts = _random_cues(rng)
+            subtitles = [{'start': s, 'end': e, 'text': t} for s, e, t in zip(starts, ends, texts)]
+            
+            assert detector._detect_by_dialogue_density(starts, texts)[0] == \
+                _reference_dialogue_density(detector, subtitles)
+            assert detector._detect_by_silence_break(starts, ends)[0] == \
+                _reference_silence_break(detector, subtitles)
+    
+    def test_empty_subtitles(self):
+        """没有字幕时两种策略都不给出结果"""
+        detector = IntroDetector()
+        empty = np.array([])
+        
+        assert detector._detect_by_dialogue_density(empty, []) == (-1, "")
+        assert detector._detect_by_silence_break(empty, empty) == (-1, "")
@@ -0,0 +1,27 @@
+"""
+JSON缓存工具单元测试
+"""
+from src.utils.json_cache import load_json_cache, save_json_cache
+
+
+class TestSaveJsonCache:
+    """测试缓存写入"""
+    
+    def test_round_trip(self, tmp_path):
+        """写入的数据可以原样读回"""
+        cache_path = tmp_path / "cache" / "result.json"
+        
+        save_json_cache(cache_path, {"intro_end": 12.5, "method": "黑屏"})
+        
+        assert load_json_cache(cache_path) == {"intro_end": 12.5, "method": "黑屏"}
+        assert list(cache_path.parent.iterdir()) == [cache_path]
+    
+    def test_unserializable_data_leaves_no_files(self, tmp_path):
+        """序列化失败时不留下临时文件，也不覆盖已有缓存"""
+        cache_path = tmp_path / "result.json"
+        save_json_cache(cache_path, {"intro_end": 1.0})
+        
+        save_json_cache(cache_path, {"intro_end": object()})
+        
+        assert list(tmp_path.iterdir()) == [cache_path]
+        assert load_json_cache(cache_path) == {"intro_end": 1.0}
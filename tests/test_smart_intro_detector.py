@@ -0,0 +1,254 @@
+"""
+智能片头检测器单元测试
+"""
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+pytest.importorskip("cv2")
+
+from src.utils.smart_intro_detector import SmartIntroDetector, _SCENE_TIME_RE, _SILENCE_END_RE
+
+
+def _reference_find_density_drop(times, drop_ratio=0.5):
+    """按窗口字典逐个比较的参考实现"""
+    density = {}
+    for time in times:
+        density[int(time // 10)] = density.get(int(time // 10), 0) + 1
+    windows = sorted(density)
+    for i in range(len(windows) - 1):
+        current = density[windows[i]]
+        if current >= 3 and density[windows[i + 1]] / current < drop_ratio:
+            return (windows[i] + 1) * 10
+    return None
+
+
+def _reference_scene_pattern(scene_times, min_intro, max_intro):
+    """逐个扫描场景时间的参考实现，返回(方法, 时间)"""
+    windows = {}
+    for time in scene_times:
+        windows[int(time // 10) * 10] = windows.get(int(time // 10) * 10, 0) + 1
+    sorted_windows = sorted(windows)
+    for i in range(len(sorted_windows) - 1):
+        current = sorted_windows[i]
+        if windows[current] >= 3 and windows[sorted_windows[i + 1]] <= 1:
+            for time in scene_times:
+                if time > current + 10 and min_intro <= time <= max_intro:
+                    return "scene_pattern", time
+    gaps = sorted(((scene_times[i + 1] - scene_times[i], scene_times[i + 1])
+                   for i in range(len(scene_times) - 1)), reverse=True)
+    if gaps[0][0] > 15 and min_intro <= gaps[0][1] <= max_intro:
+        return "scene_gap", gaps[0][1]
+    return None
+
+
+def _times_covering_every_window(rng):
+    """生成每个10秒窗口至少有一个事件的有序时间列表"""
+    window_count = int(rng.integers(2, 20))
+    counts = rng.integers(1, 6, size=window_count)
+    times = [round(float(w * 10 + rng.uniform(0, 10)), 3)
+             for w, count in enumerate(counts) for _ in range(count)]
+    return sorted(times)
+
+
+class TestProbeMemo:
+    """测试实例上的探测结果复用"""
+    
+    def test_replaced_file_is_probed_again(self, tmp_path):
+        """同一路径上的文件被替换后重新探测"""
+        video_path = tmp_path / "video.mp4"
+        video_path.write_bytes(b"old")
+        detector = SmartIntroDetector()
+        
+        with patch.object(detector, "_probe_segment",
+                          return_value={"scene_times": [], "silence_ends": []}) as probe:
+            detector._run_ffmpeg_probe(video_path)
+            first_count = probe.call_count
+            detector._run_ffmpeg_probe(video_path)
+            assert probe.call_count == first_count
+            
+            video_path.write_bytes(b"replaced")
+            detector._run_ffmpeg_probe(video_path)
+            assert probe.call_count == 2 * first_count
+
+
+class TestProbeSegments:
+    """测试ffmpeg探测的分段数"""
+    
+    def _count_segments(self, detector, tmp_path):
+        """运行一次探测，返回切分出的段数"""
+        video_path = tmp_path / "video.mp4"
+        video_path.write_bytes(b"data")
+        with patch.object(detector, "_probe_segment",
+                          return_value={"scene_times": [], "silence_ends": []}) as probe:
+            detector._run_ffmpeg_probe(video_path)
+        return probe.call_count
+    
+    def test_segments_follow_cpu_count(self, tmp_path):
+        """默认按CPU核数分段，不超过上限"""
+        with patch("src.utils.smart_intro_detector.os.cpu_count", return_value=4):
+            assert self._count_segments(SmartIntroDetector(), tmp_path) == 4
+        with patch("src.utils.smart_intro_detector.os.cpu_count", return_value=32):
+            assert self._count_segments(SmartIntroDetector(), tmp_path) == 6
+    
+    def test_explicit_segment_budget(self, tmp_path):
+        """指定分段数时不再按CPU核数分段"""
+        with patch("src.utils.smart_intro_detector.os.cpu_count", return_value=8):
+            assert self._count_segments(SmartIntroDetector(probe_segments=1), tmp_path) == 1
+    
+    @pytest.mark.parametrize("cpu_count, concurrency, expected", [
+        (8, None, 1),
+        (8, 2, 4),
+        (2, 4, 1),
+    ])
+    def test_batch_splits_cpu_budget(self, cpu_count, concurrency, expected):
+        """批量检测时各进程分摊CPU核"""
+        calls = []
+        
+        def fake_worker(detector_cls, video_path, probe_segments):
+            calls.append(probe_segments)
+            return None
+        
+        videos = [Path(f"video_{i}.mp4") for i in range(8)]
+        with patch("src.utils.smart_intro_detector.os.cpu_count", return_value=cpu_count), \
+             patch("src.utils.smart_intro_detector.ProcessPoolExecutor", ThreadPoolExecutor), \
+             patch("src.utils.smart_intro_detector._detect_in_worker", fake_worker):
+            SmartIntroDetector.detect_batch(videos, concurrency=concurrency)
+        
+        assert calls == [expected] * len(videos)
+
+
+class TestResultCache:
+    """测试检测结果缓存"""
+    
+    def test_cache_key_depends_on_early_exit(self, tmp_path):
+        """是否提前结束视觉检测会影响结果，两种设置不共用缓存"""
+        video_path = tmp_path / "video.mp4"
+        video_path.write_bytes(b"data")
+        
+        early = SmartIntroDetector()._result_cache_path(video_path)
+        full = SmartIntroDetector(early_exit_on_black=False)._result_cache_path(video_path)
+        
+        assert early != full
+        assert early == SmartIntroDetector()._result_cache_path(video_path)
+
+
+class TestDensity:
+    """测试场景和文字密度分析"""
+    
+    def test_density_counts_per_window(self):
+        """按10秒窗口计数，空窗口为0"""
+        detector = SmartIntroDetector()
+        density = detector._calculate_density([1, 2, 9.9, 10, 35])
+        assert density.tolist() == [3, 1, 0, 1]
+    
+    def test_density_drop_matches_reference(self):
+        """每个窗口都有事件时与逐窗口比较的结果一致"""
+        detector = SmartIntroDetector()
+        rng = np.random.default_rng(0)
+        for _ in range(500):
+            times = _times_covering_every_window(rng)
+            density = detector._calculate_density(times)
+            assert detector._find_density_drop(density) == _reference_find_density_drop(times)
+    
+    def test_empty_window_counts_as_drop(self):
+        """密集窗口之后的空窗口视为密度下降"""
+        detector = SmartIntroDetector()
+        density = detector._calculate_density([1, 2, 3, 4, 25, 26, 27, 28])
+        assert detector._find_density_drop(density) == 10
+    
+    def test_scene_pattern_matches_reference(self):
+        """每个窗口都有场景切换时与逐个扫描的结果一致"""
+        detector = SmartIntroDetector()
+        rng = np.random.default_rng(1)
+        for _ in range(500):
+            times = _times_covering_every_window(rng)
+            result = detector._analyze_scene_change_pattern(times)
+            expected = _reference_scene_pattern(times, detector.min_intro, detector.max_intro)
+            assert (result and (result.method, result.intro_end_seconds)) == expected
+    
+    def test_longest_gap_prefers_later_tie(self):
+        """最长间隔相同时取较晚的一个"""
+        detector = SmartIntroDetector()
+        result = detector._analyze_scene_change_pattern([0, 20, 40])
+        assert result.method == "scene_gap"
+        assert result.intro_end_seconds == 40
+    
+    def test_too_few_scenes(self):
+        """场景切换少于3次时不做判断"""
+        assert SmartIntroDetector()._analyze_scene_change_pattern([5, 50]) is None
+
+
+class TestProbeSegment:
+    """测试分段探测的偏移和合并"""
+    
+    SCENES = [2.5, 29.0, 31.25, 59.9, 60.0, 61.5, 89.0, 121.75, 150.0, 179.5]
+    # 静音区间，(开始, 结束)；跨越分段边界，最后一段持续到片头范围之外
+    SILENCES = [(10.0, 14.0), (27.0, 33.5), (58.0, 61.0), (88.0, 95.0), (119.5, 121.0), (176.0, 200.0)]
+    
+    def _fake_ffmpeg(self, cmd, patterns):
+        """按命令中的-ss和-t模拟ffmpeg输出，时间相对于定位点，在截断处伪造静音结束"""
+        seek = float(cmd[cmd.index("-ss") + 1]) if "-ss" in cmd else 0.0
+        stop = seek + float(cmd[cmd.index("-t") + 1])
+        for time in self.SCENES:
+            if seek <= time < stop:
+                yield "scene_times", _SCENE_TIME_RE.search(f"pts_time:{time - seek:.6f}")
+        for start, end in self.SILENCES:
+            visible_start, visible_end = max(start, seek), min(end, stop)
+            if visible_end - visible_start >= 3:
+                yield "silence_ends", _SILENCE_END_RE.search(f"silence_end: {visible_end - seek:.6f}")
+    
+    def _probe(self, segments):
+        """用指定分段数运行探测"""
+        detector = SmartIntroDetector(probe_segments=segments)
+        with patch("src.utils.smart_intro_detector.iter_ffmpeg_events", self._fake_ffmpeg), \
+             patch("src.utils.smart_intro_detector.file_identity", return_value=None):
+            return detector._run_ffmpeg_probe(Path("video.mp4"))
+    
+    def test_single_segment(self):
+        """单段探测保留片头范围内的所有事件"""
+        result = self._probe(1)
+        assert result["scene_times"] == [t for t in self.SCENES if t < 180]
+        assert result["silence_ends"] == [14.0, 33.5, 61.0, 95.0, 180.0]
+    
+    @pytest.mark.parametrize("segments", [2, 3, 6])
+    def test_segments_match_single_pass(self, segments):
+        """分段探测加回偏移后与单段结果一致，跨段的静音和截断处的伪静音不会重复或丢失"""
+        single = self._probe(1)
+        result = self._probe(segments)
+        assert sorted(result["scene_times"]) == single["scene_times"]
+        assert sorted(result["silence_ends"]) == single["silence_ends"]
+
+
+class TestHasText:
+    """测试基于边缘的文字检测"""
+    
+    def test_noisy_flat_frame_has_no_text(self):
+        """带颗粒噪声的纯色画面不算有文字"""
+        rng = np.random.default_rng(0)
+        gray = np.clip(128 + rng.normal(0, 2, size=(1080, 1920)), 0, 255).astype(np.uint8)
+        
+        assert not SmartIntroDetector()._has_text(gray)
+    
+    def test_text_frame(self):
+        """密集的文字笔画判为有文字"""
+        import cv2
+        
+        gray = np.zeros((1080, 1920), dtype=np.uint8)
+        for row in range(12):
+            cv2.putText(gray, "OPENING CREDITS 2024", (40, 80 + row * 85),
+                        cv2.FONT_HERSHEY_SIMPLEX, 2.5, 255, 4)
+        
+        assert SmartIntroDetector()._has_text(gray)
+    
+    def test_reused_buffer_matches_fresh_result(self):
+        """复用输出缓冲区与每次新分配的结果一致"""
+        rng = np.random.default_rng(1)
+        detector = SmartIntroDetector()
+        edge_buf = np.empty((360, 640), dtype=np.uint8)
+        for _ in range(20):
+            gray = rng.integers(0, 256, size=(360, 640), dtype=np.uint8)
+            gray[:, rng.integers(0, 640):] //= 8
+            assert detector._has_text(gray, edge_buf) == detector._has_text(gray.copy())
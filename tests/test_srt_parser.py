@@ -0,0 +1,78 @@
+"""
+SRT解析工具单元测试
+"""
+import numpy as np
+
+from src.utils.srt_parser import parse_srt_cues
+
+
+def _write(tmp_path, content: bytes):
+    """写入临时SRT文件"""
+    srt_path = tmp_path / "subtitle.srt"
+    srt_path.write_bytes(content)
+    return srt_path
+
+
+class TestParseSrtCues:
+    """测试SRT字幕解析"""
+    
+    def test_basic_cues(self, tmp_path):
+        """解析时间码和多行文本"""
+        srt_path = _write(tmp_path, (
+            "1\n00:00:01,000 --> 00:00:02,500\n第一句\n\n"
+            "2\n01:02:03,456 --> 01:02:04,000\n第二句\n第二行\n"
+        ).encode("utf-8"))
+        
+        starts, ends, texts = parse_srt_cues(srt_path)
+        
+        np.testing.assert_allclose(starts, [1.0, 3723.456])
+        np.testing.assert_allclose(ends, [2.5, 3724.0])
+        assert texts == ["第一句", "第二句 第二行"]
+    
+    def test_bom_and_crlf(self, tmp_path):
+        """带BOM、CRLF换行的文件与普通文件解析结果相同"""
+        srt_path = _write(tmp_path, (
+            "\ufeff1\r\n00:00:01,000 --> 00:00:02,000\r\nhello\r\nworld\r\n\r\n"
+            "2\r\n00:00:03,000 --> 00:00:04,000\r\nagain\r\n"
+        ).encode("utf-8"))
+        
+        starts, ends, texts = parse_srt_cues(srt_path)
+        
+        np.testing.assert_allclose(starts, [1.0, 3.0])
+        np.testing.assert_allclose(ends, [2.0, 4.0])
+        assert texts == ["hello world", "again"]
+    
+    def test_out_of_order_cues_are_sorted(self, tmp_path):
+        """乱序的字幕按开始时间排序，文本和时间保持对应"""
+        srt_path = _write(tmp_path, (
+            "1\n00:00:10,000 --> 00:00:11,000\nlate\n\n"
+            "2\n00:00:01,000 --> 00:00:02,000\nearly\n\n"
+            "3\n00:00:05,000 --> 00:00:06,000\nmiddle\n"
+        ).encode("utf-8"))
+        
+        starts, ends, texts = parse_srt_cues(srt_path)
+        
+        np.testing.assert_allclose(starts, [1.0, 5.0, 10.0])
+        np.testing.assert_allclose(ends, [2.0, 6.0, 11.0])
+        assert texts == ["early", "middle", "late"]
+    
+    def test_whitespace_first_text_line_is_kept(self, tmp_path):
+        """第一行文本只有空白的字幕不会被丢弃，全为空白的字幕跳过"""
+        srt_path = _write(tmp_path, (
+            "1\n00:00:01,000 --> 00:00:02,000\n   \nafter blank\n\n"
+            "2\n00:00:03,000 --> 00:00:04,000\n  \n\n"
+            "3\n00:00:05,000 --> 00:00:06,000\nlast\n"
+        ).encode("utf-8"))
+        
+        starts, _, texts = parse_srt_cues(srt_path)
+        
+        np.testing.assert_allclose(starts, [1.0, 5.0])
+        assert texts == ["after blank", "last"]
+    
+    def test_empty_file(self, tmp_path):
+        """空文件返回空结果"""
+        starts, ends, texts = parse_srt_cues(_write(tmp_path, b""))
+        
+        assert len(starts) == 0
+        assert len(ends) == 0
+        assert texts == []